@@ -0,0 +1,138 @@
+"""
+Benchmark del aviso masivo (bot/broadcast.py) sin Telegram ni MySQL.
+
+Los destinatarios salen de una lista en memoria y el bot es un doble que
+simula los límites de Telegram: si en el último segundo ya hubo más de
+--telegram-limit envíos responde RetryAfter, y una fracción --blocked-share
+de los usuarios tiene bloqueado al bot (Forbidden). Reporta duración, tasa
+lograda, máximo de envíos en una ventana de 1 s y cuántos RetryAfter hubo.
+
+Con --crash-after N el primer intento se corta tras N envíos (como si el
+proceso muriera) y se vuelve a correr con el mismo checkpoint; al final se
+verifica que nadie recibió el aviso dos veces ni quedó sin recibirlo.
+
+Uso:
+    python benchmarks/bench_broadcast.py --users 3000 --rate 28 --crash-after 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from telegram.error import Forbidden, RetryAfter
+
+from bot import broadcast
+
+
+class FakeBot:
+    """send_message con latencia, límite por ventana de 1 s y usuarios que bloquearon al bot"""
+
+    def __init__(self, latency_ms, limit, blocked, crash_after=None):
+        self.latency = latency_ms / 1000
+        self.limit = limit
+        self.blocked = blocked
+        self.crash_after = crash_after
+        self.delivered = Counter()
+        self.retry_after = 0
+        self.max_window = 0
+        self._window = deque()
+        self.crashed = asyncio.Event()
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        now = time.perf_counter()
+        while self._window and now - self._window[0] > 1.0:
+            self._window.popleft()
+        if len(self._window) >= self.limit:
+            self.retry_after += 1
+            raise RetryAfter(1)
+        self._window.append(now)
+        self.max_window = max(self.max_window, len(self._window))
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.delivered[chat_id] += 1
+        if self.crash_after is not None and sum(self.delivered.values()) >= self.crash_after:
+            self.crashed.set()
+
+
+def use_recipients(user_ids):
+    ordered = sorted(user_ids)
+
+    def count_recipients(tipo=None):
+        return len(ordered)
+
+    def fetch_recipients(after, limit, tipo=None):
+        return [u for u in ordered if u > after][:limit]
+
+    broadcast.count_recipients = count_recipients
+    broadcast.fetch_recipients = fetch_recipients
+
+
+async def run_once(bot, args, checkpoint):
+    task = asyncio.create_task(broadcast.run_broadcast(
+        bot, "Aviso de prueba", checkpoint_path=checkpoint,
+        batch_size=args.batch_size, rate=args.rate, workers=args.workers
+    ))
+    crashed = asyncio.create_task(bot.crashed.wait())
+    await asyncio.wait([task, crashed], return_when=asyncio.FIRST_COMPLETED)
+    if not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        print(f"💥 Proceso cortado tras {sum(bot.delivered.values())} envíos; reanudando...")
+        return False
+    crashed.cancel()
+    return True
+
+
+async def main_async(args):
+    random.seed(args.seed)
+    user_ids = [str(1_000_000 + i) for i in range(args.users)]
+    blocked = {int(u) for u in random.sample(user_ids, int(args.users * args.blocked_share))}
+    use_recipients(user_ids)
+
+    bot = FakeBot(args.telegram_latency_ms, args.telegram_limit, blocked, args.crash_after)
+    checkpoint = os.path.join(tempfile.mkdtemp(prefix="bench_broadcast_"), "checkpoint.json")
+
+    started = time.perf_counter()
+    if not await run_once(bot, args, checkpoint):
+        bot.crash_after = None
+        bot.crashed = asyncio.Event()
+        await run_once(bot, args, checkpoint)
+    elapsed = time.perf_counter() - started
+
+    sent = sum(bot.delivered.values())
+    duplicates = sum(1 for n in bot.delivered.values() if n > 1)
+    missing = args.users - len(blocked) - len(bot.delivered)
+    print(f"\nDuración: {elapsed:.1f}s  entregados={sent} ({sent / elapsed:.1f}/s)  bloqueados={len(blocked)}")
+    print(f"Máximo en 1 s: {bot.max_window} (límite simulado {args.telegram_limit})  RetryAfter: {bot.retry_after}")
+    print(f"Duplicados: {duplicates}  sin recibir: {missing}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=broadcast.BROADCAST_RATE)
+    parser.add_argument("--workers", type=int, default=broadcast.BROADCAST_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=broadcast.BROADCAST_BATCH_SIZE)
+    parser.add_argument("--telegram-latency-ms", type=float, default=150)
+    parser.add_argument("--telegram-limit", type=int, default=30, help="envíos por segundo antes de RetryAfter")
+    parser.add_argument("--blocked-share", type=float, default=0.05)
+    parser.add_argument("--crash-after", type=int, help="cortar el primer intento tras N envíos")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: latencia de updates del bot con confirmaciones concurrentes.
+
+Compara el camino bloqueante (INSERT síncrono dentro del event loop) con el
+camino awaitable (confirm_and_save -> register_request_async). La base de
+datos se simula con un time.sleep para poder correrlo sin MySQL.
+
+Uso:
+    python benchmarks/bench_confirm_latency.py --users 200 --db-latency-ms 40
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import bot.db as db
+from bot import handlers
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def prepare_users(n_users):
+    for user_id in range(n_users):
+        handlers.start_request_flow(user_id)
+        handlers.process_message(user_id, f"Usuario {user_id}")
+        handlers.process_message(user_id, f"user{user_id}@estudiante.edu.sv")
+        handlers.set_request_type(user_id, "Constancia")
+        handlers.process_message(user_id, "Constancia de notas")
+
+
+async def blocking_confirm(user_id):
+    # Comportamiento anterior: INSERT síncrono en el hilo del event loop
+    session = handlers.user_states.pop(user_id)
+    db.register_request(user_id, session.nombre, session.correo,
+                        session.tipo_solicitud, session.detalle)
+    return True
+
+
+async def light_update(user_id):
+    # Update barato de otro chat (p. ej. una FAQ)
+    handlers.process_message(10_000_000 + user_id, "horario")
+
+
+async def run(mode, n_users, interval_s):
+    prepare_users(n_users)
+    confirm = handlers.confirm_and_save if mode == "async" else blocking_confirm
+    latencies = {"confirm": [], "other": []}
+
+    async def timed(kind, coro, arrival):
+        await coro
+        latencies[kind].append((time.perf_counter() - arrival) * 1000)
+
+    tasks = []
+    started = time.perf_counter()
+    for user_id in range(n_users):
+        # Cada confirmación llega intercalada con un update de otro usuario,
+        # igual que con concurrent_updates en python-telegram-bot. La llegada
+        # es la programada: si el loop está bloqueado, la espera cuenta.
+        arrival = started + user_id * interval_s
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed("confirm", confirm(user_id), arrival)))
+        tasks.append(asyncio.create_task(timed("other", light_update(user_id), arrival)))
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--db-latency-ms", type=float, default=40.0)
+    parser.add_argument("--interval-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    db_latency = args.db_latency_ms / 1000
+
+    def fake_register_request(*_args):
+        time.sleep(db_latency)
+
+    db.register_request = fake_register_request
+
+    print(f"usuarios={args.users} latencia_bd={args.db_latency_ms}ms "
+          f"pool={db.POOL_SIZE}")
+    for mode in ("blocking", "async"):
+        handlers.user_states.clear()
+        started = time.perf_counter()
+        latencies = asyncio.run(run(mode, args.users, args.interval_ms / 1000))
+        elapsed = time.perf_counter() - started
+        for kind, values in latencies.items():
+            print(f"{mode:>8} {kind:>7}: p50={percentile(values, 50):8.1f}ms "
+                  f"p95={percentile(values, 95):8.1f}ms "
+                  f"p99={percentile(values, 99):8.1f}ms")
+        print(f"{mode:>8}   total: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
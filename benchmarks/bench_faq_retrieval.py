@@ -0,0 +1,94 @@
+"""
+Benchmark: búsquedas por segundo del índice local de FAQ.
+
+Genera un corpus sintético de varios miles de preguntas (combinando
+plantillas de trámites) y mide la construcción del índice, la búsqueda
+de un mensaje a la vez y la búsqueda por lotes. Corre sin red.
+
+Uso:
+    python benchmarks/bench_faq_retrieval.py --corpus 5000 --queries 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from bot.faq_retrieval import FaqIndex, load_corpus
+
+PREFIJOS = [
+    "¿Cómo solicito", "¿Dónde pido", "¿Cuánto tarda", "¿Qué necesito para",
+    "¿Cuál es el costo de", "¿Quién firma", "¿Puedo pedir en línea",
+    "How do I request", "How long does it take to get",
+]
+TRAMITES = [
+    "una constancia de notas", "la certificación de notas", "el reingreso",
+    "la equivalencia de materias", "el retiro de ciclo", "la prórroga de pago",
+    "el carnet estudiantil", "la constancia de egresado", "el examen de suficiencia",
+    "la inscripción extemporánea", "el historial académico", "las horas sociales",
+]
+SUFIJOS = ["", " este ciclo", " para maestría", " si soy egresado", " con urgencia",
+           " en la sede central", " para trámite de visa", " por correo"]
+
+
+def synthetic_corpus(size, seed=7):
+    rng = random.Random(seed)
+    questions = []
+    answers = []
+    base_q, base_a = load_corpus()
+    questions.extend(base_q)
+    answers.extend(base_a)
+    while len(questions) < size:
+        q = f"{rng.choice(PREFIJOS)} {rng.choice(TRAMITES)}{rng.choice(SUFIJOS)} #{len(questions)}?"
+        questions.append(q)
+        answers.append(f"Respuesta sintética {len(questions)}")
+    return questions, answers
+
+
+def typo(text, rng):
+    # Mensajes de usuario con faltas: se borra una letra al azar
+    if len(text) < 4:
+        return text
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    questions, answers = synthetic_corpus(args.corpus)
+
+    started = time.perf_counter()
+    index = FaqIndex(questions, answers)
+    build_s = time.perf_counter() - started
+    print(f"corpus={len(questions)} vocabulario={len(index.vocabulary)} "
+          f"nnz={index.matrix.nnz} construcción={build_s:.2f}s")
+
+    queries = [typo(rng.choice(questions).lower(), rng) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    hits = sum(1 for q in queries if index.search([q])[0] is not None)
+    single_s = time.perf_counter() - started
+    print(f"  uno a uno: {args.queries / single_s:9.0f} búsquedas/s "
+          f"({single_s / args.queries * 1000:.2f} ms c/u, aciertos={hits})")
+
+    started = time.perf_counter()
+    hits = 0
+    for i in range(0, len(queries), args.batch):
+        hits += sum(1 for r in index.search(queries[i:i + args.batch]) if r is not None)
+    batch_s = time.perf_counter() - started
+    print(f"  por lotes: {args.queries / batch_s:9.0f} búsquedas/s "
+          f"(lote={args.batch}, aciertos={hits})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: clasificador de intenciones por puntaje vs. la cadena de
+`in` original.
+
+Cada mensaje sintético combina frases reales y termina con un número, así
+que no hay dos iguales. También informa en cuántos mensajes cambia la
+intención respecto a la versión original (ver el puntaje en bot/intents.py).
+
+Uso:
+    python benchmarks/bench_intents.py --messages 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from bot.intents import classify_intent, classify_intents
+
+
+def legacy_classify_intent(message):
+    # Copia de la versión anterior de bot.intents.classify_intent
+    msg = message.lower()
+
+    if "horario" in msg or "hora" in msg or "abierto" in msg:
+        return "horario"
+
+    if "requisito" in msg or "documento" in msg or "necesito" in msg:
+        return "requisitos"
+
+    if "información" in msg or "informacion" in msg or "ayuda" in msg:
+        return "informacion"
+
+    if "solicitud" in msg or "tramite" in msg or "trámite" in msg or "constancia" in msg:
+        return "registrar_solicitud"
+
+    return "otro"
+
+
+FRASES = [
+    "¿Cuál es el horario de atención?", "¿Están abiertos hoy?", "¿Qué requisitos piden?",
+    "Necesito información sobre becas", "Quiero iniciar una solicitud ahora",
+    "Me ayuda con un trámite", "constancia de notas por favor", "hola buenas tardes",
+    "No puedo entrar al portal de notas", "¿Dónde queda la oficina?",
+    "ahora mismo no tengo el documento", "What time do you open?",
+    "El sistema de pagos no refleja mi transacción desde el lunes pasado",
+]
+
+
+def synthetic_messages(n, seed=3):
+    rng = random.Random(seed)
+    return [f"{' '.join(rng.sample(FRASES, rng.randint(1, 3)))} {i}" for i in range(n)]
+
+
+def bench(fn, messages):
+    started = time.perf_counter()
+    results = fn(messages)
+    return time.perf_counter() - started, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+
+    messages = synthetic_messages(args.messages)
+
+    legacy_s, legacy = bench(lambda ms: [legacy_classify_intent(m) for m in ms], messages)
+    single_s, _ = bench(lambda ms: [classify_intent(m) for m in ms], messages)
+    batch_s, scored = bench(classify_intents, messages)
+
+    changed = sum(1 for a, b in zip(legacy, scored) if a != b)
+    print(f"mensajes={len(messages)} distintos={len(set(messages))}")
+    print(f"  original : {len(messages) / legacy_s:10.0f} msg/s")
+    print(f"  puntaje  : {len(messages) / single_s:10.0f} msg/s (uno a uno)")
+    print(f"  puntaje  : {len(messages) / batch_s:10.0f} msg/s (lote)")
+    print(f"  clasificación distinta en {changed} mensajes ({changed / len(messages):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmark: latencia de la búsqueda FULLTEXT sobre requests.
+
+Llena una base de datos de pruebas con un corpus sintético (1M de
+solicitudes por defecto), crea el índice ft_requests_busqueda y mide
+search_requests() con búsquedas típicas de operadores: frases de trámites,
+fragmentos de correo y nombres. Para comparar, mide también unas cuantas
+búsquedas con LIKE '%...%', que recorren la tabla completa.
+
+Necesita MySQL: usa las credenciales del .env pero con la base indicada en
+--database, que se crea si no existe. Nunca apuntarlo a la base de producción.
+
+Uso:
+    python benchmarks/bench_search.py --database csdc_bench --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+NOMBRES = ["Ana", "Carlos", "José", "María", "Luis", "Sofía", "Jorge", "Daniela",
+           "Kevin", "Gabriela", "Fernando", "Andrea", "Ricardo", "Valeria", "Mario"]
+APELLIDOS = ["Pérez", "Hernández", "Martínez", "López", "Rivera", "Flores", "Ramírez",
+             "Cruz", "Castillo", "Mejía", "Guardado", "Alvarado", "Portillo", "Orellana"]
+TIPOS = ["Constancia", "Trámite Administrativo", "Consulta Técnica", "Otro"]
+DETALLES = [
+    "Necesito una constancia de notas para {motivo}",
+    "Solicito certificación de notas del ciclo {ciclo}",
+    "Quiero tramitar el reingreso para el ciclo {ciclo}",
+    "Consulta sobre equivalencia de materias de {carrera}",
+    "Problema con el acceso al campus virtual, {motivo}",
+    "Solicito prórroga de pago de la cuota de {mes}",
+    "Necesito constancia de egresado de {carrera} para {motivo}",
+    "Reposición de carnet estudiantil extraviado en {mes}",
+]
+MOTIVOS = ["trámite de visa", "beca", "trabajo", "maestría", "la embajada", "no me deja entrar"]
+CARRERAS = ["Ingeniería en Sistemas", "Contaduría", "Psicología", "Derecho", "Arquitectura"]
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto"]
+
+BUSQUEDAS = [
+    "constancia de notas", "certificación", "reingreso ciclo", "equivalencia materias",
+    "campus virtual", "prórroga de pago", "constancia de egresado visa", "carnet",
+    "beca", "maestría psicología",
+]
+
+CREATE_SQL = """
+    CREATE TABLE requests (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id VARCHAR(50),
+        nombre VARCHAR(150),
+        correo VARCHAR(150),
+        tipo_solicitud VARCHAR(150),
+        detalle TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_requests_timestamp (timestamp)
+    )
+"""
+
+
+def synthetic_row(i, rng):
+    nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}"
+    usuario = nombre.lower().replace(" ", ".").replace("é", "e").replace("í", "i").replace("á", "a")
+    detalle = rng.choice(DETALLES).format(
+        motivo=rng.choice(MOTIVOS), ciclo=f"{rng.randint(1, 2)}-{rng.randint(2019, 2025)}",
+        carrera=rng.choice(CARRERAS), mes=rng.choice(MESES)
+    )
+    return (str(rng.randrange(10 ** 9)), nombre, f"{usuario}{i}@estudiante.edu.sv",
+            rng.choice(TIPOS), detalle)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def prepare(db, n_rows, batch):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SHOW TABLES LIKE 'requests'")
+        created = cursor.fetchone() is None
+        if created:
+            cursor.execute(CREATE_SQL)
+        cursor.execute("SELECT COUNT(*) FROM requests")
+        existing = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        conn.close()
+
+    rng = random.Random(existing)
+    started = time.perf_counter()
+    for offset in range(existing, n_rows, batch):
+        rows = [synthetic_row(i, rng) for i in range(offset, min(offset + batch, n_rows))]
+        db.register_requests_batch(rows)
+        print(f"\r  insertadas {offset + len(rows):,}/{n_rows:,}", end="", flush=True)
+    if existing < n_rows:
+        print(f"\n  carga: {time.perf_counter() - started:.1f}s")
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SHOW INDEX FROM requests WHERE Key_name = 'ft_requests_busqueda'")
+        has_index = bool(cursor.fetchall())
+        if not has_index:
+            # Crear el índice después de la carga es mucho más rápido que mantenerlo fila a fila
+            started = time.perf_counter()
+            cursor.execute(
+                "ALTER TABLE requests ADD FULLTEXT INDEX ft_requests_busqueda (nombre, correo, detalle)"
+            )
+            print(f"  índice FULLTEXT: {time.perf_counter() - started:.1f}s")
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def like_search(db, text, limit):
+    like = f"%{text}%"
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        started = time.perf_counter()
+        cursor.execute(
+            "SELECT id FROM requests WHERE nombre LIKE %s OR correo LIKE %s OR detalle LIKE %s "
+            "ORDER BY timestamp DESC LIMIT %s",
+            (like, like, like, limit)
+        )
+        cursor.fetchall()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        cursor.close()
+    finally:
+        conn.close()
+    return elapsed_ms
+
+
+def report(label, latencies):
+    print(f"  {label:<10} p50={percentile(latencies, 50):8.1f} ms  "
+          f"p95={percentile(latencies, 95):8.1f} ms  max={max(latencies):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", required=True, help="base de datos de pruebas")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--like-queries", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.database == "csdc_chatbot":
+        parser.error("usa una base de datos de pruebas, no la de producción")
+
+    # Antes de importar bot.db: load_dotenv no pisa variables ya definidas
+    os.environ["MYSQLDATABASE"] = args.database
+    os.environ["DB_WRITE_BEHIND"] = "0"
+    import bot.db as db
+    from streamlit_app.queries import search_requests
+
+    import mysql.connector
+    admin = mysql.connector.connect(**{**db._db_config(), "database": None})
+    admin.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    admin.close()
+
+    print(f"Preparando {args.rows:,} solicitudes en {args.database}...")
+    prepare(db, args.rows, args.batch)
+
+    rng = random.Random(3)
+    searches = []
+    for _ in range(args.queries):
+        kind = rng.random()
+        if kind < 0.6:
+            searches.append(rng.choice(BUSQUEDAS))
+        elif kind < 0.8:
+            # Fragmento de correo
+            searches.append(f"{rng.choice(NOMBRES).lower()[:4]}.{rng.choice(APELLIDOS).lower()[:3]}")
+        else:
+            searches.append(f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}")
+
+    fulltext = []
+    results = 0
+    for text in searches:
+        frame, elapsed_ms = search_requests(text, limit=args.limit)
+        fulltext.append(elapsed_ms)
+        results += len(frame)
+    print(f"\nBúsquedas: {len(searches)} (límite {args.limit}, resultados={results})")
+    report("FULLTEXT", fulltext)
+
+    like = [like_search(db, text, args.limit) for text in searches[:args.like_queries]]
+    if like:
+        report("LIKE", like)
+
+
+if __name__ == "__main__":
+    main()
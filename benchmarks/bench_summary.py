@@ -0,0 +1,105 @@
+"""
+Benchmark: cálculo de KPIs, gráficas e insights del dashboard.
+
+Compara el cálculo anterior en pandas (columnas derivadas con .dt/.map,
+mode() y value_counts() repetidos, pivot_table) con compute_summary(), que
+hace una sola pasada con np.bincount. Mide ambos sobre filas crudas y,
+para compute_summary, también sobre los rollups horarios equivalentes.
+Corre sin MySQL con datos sintéticos.
+
+Uso:
+    python benchmarks/bench_summary.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from streamlit_app.summary import compute_summary
+
+TIPOS = ["Constancia", "Trámite Administrativo", "Consulta Técnica", "Otro"]
+DIAS = {0: "Lun", 1: "Mar", 2: "Mié", 3: "Jue", 4: "Vie", 5: "Sáb", 6: "Dom"}
+
+
+def synthetic_requests(n_rows, seed=5):
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 365 * 86400, n_rows)
+    return pd.DataFrame({
+        "timestamp": pd.Timestamp("2025-01-01") + pd.to_timedelta(seconds, unit="s"),
+        "tipo_solicitud": rng.choice(TIPOS, n_rows, p=[0.4, 0.3, 0.2, 0.1]),
+    })
+
+
+def legacy_summary(df, today):
+    # Cálculo anterior de las secciones A-C, tal como estaba en dashboard.py
+    # (la máscara equivale al filtro de fechas cubriendo todo el rango)
+    df_filtered = df[df["timestamp"].dt.date >= df["timestamp"].dt.date.min()].copy()
+    df_filtered["date"] = df_filtered["timestamp"].dt.date
+    df_filtered["hour"] = df_filtered["timestamp"].dt.hour
+    df_filtered["day_name"] = df_filtered["timestamp"].dt.dayofweek.map(DIAS)
+    total = len(df_filtered)
+    sol_hoy = len(df[df["timestamp"].dt.date == today])
+    top_tramite = df_filtered["tipo_solicitud"].mode()[0]
+    hora_pico = df_filtered["hour"].mode()[0]
+    trend = df_filtered.groupby("date").size().reset_index(name="count")
+    dist = df_filtered["tipo_solicitud"].value_counts()
+    heat = df_filtered.pivot_table(
+        index="day_name", columns="hour", values="tipo_solicitud", aggfunc="count", fill_value=0
+    )
+    pct_top = int((df_filtered["tipo_solicitud"].value_counts().max() / total) * 100)
+    h_pico = df_filtered["hour"].mode()[0]
+    return total, sol_hoy, top_tramite, hora_pico, trend, dist, heat, pct_top, h_pico
+
+
+def hourly_rollups(df):
+    return (
+        df.assign(timestamp=df["timestamp"].dt.floor("h"))
+        .groupby(["timestamp", "tipo_solicitud"]).size().reset_index(name="count")
+    )
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    today = date(2025, 6, 15)
+    print(f"{'filas':>10} {'pandas':>10} {'bincount':>10} {'categ.':>10} {'rollups':>10}")
+    for size in args.sizes:
+        df = synthetic_requests(size)
+        as_category = df.astype({"tipo_solicitud": "category"})
+        rollups = hourly_rollups(df)
+
+        summary = compute_summary(df, today=today)
+        legacy = legacy_summary(df, today)
+        assert summary.total == legacy[0] and summary.today == legacy[1]
+        assert summary.top_tramite == legacy[2] and summary.peak_hour == legacy[3]
+
+        legacy_ms = best_of(lambda: legacy_summary(df, today), args.repeat)
+        single_ms = best_of(lambda: compute_summary(df, today=today), args.repeat)
+        category_ms = best_of(lambda: compute_summary(as_category, today=today), args.repeat)
+        rollup_ms = best_of(lambda: compute_summary(rollups, today=today), args.repeat)
+        print(f"{size:>10,} {legacy_ms:>8.1f}ms {single_ms:>8.1f}ms "
+              f"{category_ms:>8.1f}ms {rollup_ms:>8.1f}ms  ({len(rollups):,} filas de rollup)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Servidor local que imita POST /v1/chat/completions de OpenAI.
+
+Responde después de una latencia configurable (con variación aleatoria) y
+una tasa de errores opcional, para probar el bot sin red ni costo. El
+cliente del bot se apunta aquí con OPENAI_BASE_URL.
+
+Con "stream": true responde como OpenAI en SSE: el primer fragmento llega a
+los --first-token-ms y el resto se reparte hasta completar la latencia.
+
+Uso:
+    python benchmarks/fake_openai.py --port 8765 --latency-ms 800
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=x python main.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer:
+    """ThreadingHTTPServer en un hilo de fondo; cada petición duerme en su propio hilo"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=800, jitter_ms=200, error_rate=0.0,
+                 first_token_ms=250):
+        self.latency_ms = latency_ms
+        self.first_token_ms = first_token_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.stats = {"requests": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _delay(self):
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, request, question, delay):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                tokens = re.findall(r"\S+\s*|\s+", fake_answer(question))
+                first = min(delay, server.first_token_ms / 1000)
+                step = (delay - first) / max(1, len(tokens) - 1)
+                base = {
+                    "id": f"chatcmpl-fake-{server.stats['requests']}",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                }
+                time.sleep(first)
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(step)
+                    delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                    self._send_event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                self._send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _send_event(self, payload):
+                self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                with server._lock:
+                    server.stats["requests"] += 1
+                delay = server._delay()
+                question = request.get("messages", [{}])[-1].get("content", "")
+
+                if random.random() < server.error_rate:
+                    time.sleep(delay)
+                    with server._lock:
+                        server.stats["errors"] += 1
+                    self._send_json(500, {"error": {"message": "fake upstream error", "type": "server_error"}})
+                    return
+                if request.get("stream"):
+                    self._send_stream(request, question, delay)
+                    return
+
+                time.sleep(delay)
+                self._send_json(200, {
+                    "id": f"chatcmpl-fake-{server.stats['requests']}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": fake_answer(question)},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def fake_answer(question):
+    return (
+        "**Respuesta de prueba**\n\n"
+        f"Recibí tu consulta: _{question[:80]}_.\n"
+        "- Revisa los requisitos en la oficina del CSDC.\n"
+        "- Horario: lunes a viernes de 8:00 a 16:00."
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--first-token-ms", type=float, default=250, help="primer fragmento en modo streaming")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                              args.first_token_ms)
+    print(f"OpenAI falso en {server.base_url} (latencia {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
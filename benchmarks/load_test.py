@@ -0,0 +1,343 @@
+"""
+Prueba de carga del bot sin Telegram, OpenAI ni MySQL reales.
+
+Arma objetos Update/CallbackQuery reales de python-telegram-bot y los pasa
+por la Application completa (PerUserUpdateProcessor, handle_message,
+button_handler). Lo externo se reemplaza por dobles locales:
+
+- API de Telegram: un BaseRequest que responde al instante (o con la
+  latencia indicada) sin salir a la red.
+- OpenAI: el servidor de benchmarks/fake_openai.py vía OPENAI_BASE_URL.
+- MySQL: una conexión falsa que duerme --db-latency-ms por consulta.
+
+Llegan --rate usuarios por segundo. Cada uno recorre el flujo completo
+(saludo -> FAQ -> iniciar -> nombre -> correo -> tipo -> detalle ->
+confirmar) o, con probabilidad --ai-share, saludo + pregunta libre que cae
+en el fallback de IA. Al final reporta throughput y p50/p95/p99 por paso;
+"ia_1er_txt" es el tiempo hasta el primer mensaje con texto de la IA (con
+streaming llega mucho antes que la respuesta completa).
+
+Uso:
+    python benchmarks/load_test.py --users 500 --rate 50 --ai-share 0.3 --openai-latency-ms 800
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from telegram import Update
+from telegram.request import BaseRequest
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+FAKE_TOKEN = "123456:LOAD-TEST"
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "CSDC", "username": "csdc_load_test_bot"}
+
+FLOW_SCRIPT = [
+    ("saludo", "message", "hola"),
+    ("faq", "message", "¿Cuál es el horario de atención?"),
+    ("iniciar", "callback", "solicitud"),
+    ("nombre", "message", "Estudiante {uid}"),
+    ("correo", "message", "e{uid}@estudiante.edu.sv"),
+    ("tipo", "callback", "tipo_constancia"),
+    ("detalle", "message", "Necesito constancia de notas del ciclo I-2024"),
+    ("confirmar", "callback", "flow_confirm"),
+]
+AI_SCRIPT = [
+    ("saludo", "message", "hola"),
+    ("ia", "message", "¿Me explican cómo funciona la graduación en la carrera número {question}?"),
+]
+STEP_ORDER = [step for step, _, _ in FLOW_SCRIPT] + ["ia", "ia_1er_txt"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# -------------------------------------------------------
+# DOBLES: TELEGRAM Y MYSQL
+# -------------------------------------------------------
+class FakeTelegramRequest(BaseRequest):
+    """Responde la API de Telegram en memoria; cuenta las llamadas por método"""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+        self.calls = defaultdict(int)
+        # chat_id -> perf_counter del primer sendMessage desde reset_first_message()
+        self.first_message_at = {}
+        self._message_id = 0
+
+    def reset_first_message(self, chat_id):
+        self.first_message_at.pop(chat_id, None)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return None
+
+    def _message(self, params):
+        self._message_id += 1
+        return {
+            "message_id": params.get("message_id", self._message_id),
+            "date": int(time.time()),
+            "chat": {"id": params.get("chat_id", 0), "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if endpoint == "sendMessage":
+            self.first_message_at.setdefault(params.get("chat_id"), time.perf_counter())
+
+        if endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint in ("sendMessage", "editMessageText"):
+            result = self._message(params)
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode("utf-8")
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.db.query(sql, 1)
+
+    def executemany(self, sql, rows):
+        self.db.query(sql, len(rows))
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        time.sleep(self.db.latency)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Sustituto de MySQL: cada consulta duerme `latency_ms` y se cuentan las filas por tabla"""
+
+    def __init__(self, latency_ms=5.0):
+        self.latency = latency_ms / 1000
+        self.rows = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def query(self, sql, n_rows):
+        time.sleep(self.latency)
+        words = sql.split()
+        if words and words[0].upper() == "INSERT":
+            with self._lock:
+                self.rows[words[2]] += n_rows
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+# -------------------------------------------------------
+# UPDATES SINTÉTICOS
+# -------------------------------------------------------
+def _user(uid):
+    return {"id": uid, "is_bot": False, "first_name": f"Estudiante {uid}", "language_code": "es"}
+
+def _chat(uid):
+    return {"id": uid, "type": "private"}
+
+def message_update(update_id, uid, text):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": _chat(uid),
+            "from": _user(uid),
+            "text": text,
+        },
+    }
+
+def callback_update(update_id, uid, data):
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(uid),
+            "chat_instance": str(uid),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": _chat(uid),
+                "from": BOT_USER,
+                "text": "menú",
+            },
+        },
+    }
+
+
+class LoadTest:
+    def __init__(self, app, telegram, args):
+        self.app = app
+        self.telegram = telegram
+        self.args = args
+        self.latencies = defaultdict(list)
+        self.errors = 0
+        self.flows_done = 0
+        self._update_id = 0
+        self._rng = random.Random(args.seed)
+
+    async def on_error(self, update, context):
+        self.errors += 1
+
+    async def send(self, kind, uid, payload):
+        self._update_id += 1
+        build = message_update if kind == "message" else callback_update
+        update = Update.de_json(build(self._update_id, uid, payload), self.app.bot)
+        # Mismo camino que los updates de polling/webhook: pasa por el procesador por usuario
+        await self.app.update_processor.process_update(update, self.app.process_update(update))
+
+    async def run_user(self, uid, script):
+        question = uid if self._rng.random() >= self.args.ai_repeat_share else self._rng.randrange(10)
+        for step, kind, payload in script:
+            self.telegram.reset_first_message(uid)
+            started = time.perf_counter()
+            await self.send(kind, uid, payload.format(uid=uid, question=question))
+            self.latencies[step].append((time.perf_counter() - started) * 1000)
+            if step == "ia" and uid in self.telegram.first_message_at:
+                self.latencies["ia_1er_txt"].append((self.telegram.first_message_at[uid] - started) * 1000)
+            if self.args.think_ms:
+                await asyncio.sleep(self._rng.uniform(0, 2 * self.args.think_ms) / 1000)
+        if script is FLOW_SCRIPT:
+            self.flows_done += 1
+
+    async def run(self):
+        tasks = []
+        for i in range(self.args.users):
+            script = AI_SCRIPT if self._rng.random() < self.args.ai_share else FLOW_SCRIPT
+            tasks.append(asyncio.create_task(self.run_user(1_000_000 + i, script)))
+            await asyncio.sleep(1 / self.args.rate)
+        await asyncio.gather(*tasks)
+
+
+def report(test, elapsed, telegram, fake_db, openai_server):
+    updates = sum(len(v) for step, v in test.latencies.items() if step != "ia_1er_txt")
+    print(f"\nDuración: {elapsed:.1f}s  updates={updates} ({updates / elapsed:.1f}/s)  "
+          f"flujos completos={test.flows_done} ({test.flows_done / elapsed:.1f}/s)  errores={test.errors}")
+    print(f"\n{'paso':<10} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for step in STEP_ORDER:
+        values = test.latencies.get(step)
+        if not values:
+            continue
+        print(f"{step:<10} {len(values):>6} "
+              f"{percentile(values, 50):>7.1f}ms {percentile(values, 95):>7.1f}ms "
+              f"{percentile(values, 99):>7.1f}ms {max(values):>7.1f}ms")
+    print(f"\nTelegram: {dict(telegram.calls)}")
+    print(f"OpenAI falso: {openai_server.stats}")
+    print(f"Filas insertadas: {dict(fake_db.rows)}")
+
+
+async def main_async(args):
+    openai_server = FakeOpenAIServer(
+        latency_ms=args.openai_latency_ms, jitter_ms=args.openai_jitter_ms,
+        error_rate=args.openai_error_rate, first_token_ms=args.openai_first_token_ms
+    ).start()
+
+    # Antes de importar el bot: load_dotenv no pisa variables ya definidas
+    os.environ["OPENAI_BASE_URL"] = openai_server.base_url
+    os.environ["OPENAI_API_KEY"] = "sk-load-test"
+    os.environ["DB_WRITE_BEHIND"] = "0"
+    os.environ["SESSION_BACKEND"] = "memory"
+    os.environ["AI_CACHE_PATH"] = ""
+    os.environ["OPENAI_STREAM"] = "0" if args.no_stream else "1"
+    os.environ["BOT_MAX_CONCURRENT_UPDATES"] = str(args.max_concurrent)
+
+    import bot.db as db
+    from bot.telegram_bot import build_application, post_init, post_shutdown
+
+    fake_db = FakeDatabase(args.db_latency_ms)
+    db.get_connection = fake_db.connect
+
+    telegram = FakeTelegramRequest(args.telegram_latency_ms)
+    app = build_application(polling=False, token=FAKE_TOKEN, request=telegram)
+    test = LoadTest(app, telegram, args)
+    app.add_error_handler(test.on_error)
+
+    async with app:
+        await post_init(app)
+        started = time.perf_counter()
+        await test.run()
+        elapsed = time.perf_counter() - started
+        await post_shutdown(app)
+
+    openai_server.stop()
+    report(test, elapsed, telegram, fake_db, openai_server)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20, help="usuarios nuevos por segundo")
+    parser.add_argument("--ai-share", type=float, default=0.3, help="fracción de usuarios que preguntan a la IA")
+    parser.add_argument("--ai-repeat-share", type=float, default=0.0,
+                        help="fracción de preguntas de IA repetidas (aciertos de caché)")
+    parser.add_argument("--think-ms", type=float, default=0, help="pausa media entre mensajes de un usuario")
+    parser.add_argument("--openai-latency-ms", type=float, default=800)
+    parser.add_argument("--openai-jitter-ms", type=float, default=200)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-first-token-ms", type=float, default=250)
+    parser.add_argument("--no-stream", action="store_true", help="respuestas de IA completas, sin streaming")
+    parser.add_argument("--telegram-latency-ms", type=float, default=0)
+    parser.add_argument("--db-latency-ms", type=float, default=5)
+    parser.add_argument("--max-concurrent", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""
+Aviso masivo por Telegram a quienes registraron solicitudes.
+
+Los destinatarios (user_id distintos de `requests`) se leen por lotes con
+paginación por llave y se envían por una cola de salida que respeta el
+límite global de Telegram (BROADCAST_RATE mensajes/s) y el de cada chat.
+Un RetryAfter pausa toda la cola el tiempo que pide Telegram.
+
+El avance queda en un checkpoint (último user_id de cada lote terminado más
+un diario de los ya atendidos del lote en curso): si el proceso se cae, al
+volver a correr el mismo comando continúa donde iba sin repetir envíos.
+
+    python run_broadcast.py --message "La oficina estará cerrada el lunes 3."
+    python run_broadcast.py --message-file aviso.md --tipo Constancia
+    python run_broadcast.py --message "..." --dry-run
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dotenv import load_dotenv
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from telegram.request import HTTPXRequest
+from bot import metrics
+from bot.db import get_connection
+
+load_dotenv()
+
+# Telegram documenta ~30 mensajes/s en envíos masivos y 1 por segundo por chat
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "28"))
+BROADCAST_PER_CHAT_INTERVAL = float(os.getenv("BROADCAST_PER_CHAT_INTERVAL", "1"))
+# Envíos en vuelo a la vez (cubre la latencia de la API a la tasa máxima)
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "32"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "500"))
+# Intentos ante errores de red; los RetryAfter no cuentan como intento
+BROADCAST_MAX_ATTEMPTS = int(os.getenv("BROADCAST_MAX_ATTEMPTS", "5"))
+BROADCAST_CHECKPOINT = os.getenv("BROADCAST_CHECKPOINT", "broadcast_checkpoint.json")
+BROADCAST_PROGRESS_SECONDS = float(os.getenv("BROADCAST_PROGRESS_SECONDS", "5"))
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+# -------------------------------------------------------
+# DESTINATARIOS
+# -------------------------------------------------------
+def _recipient_filter(tipo):
+    # user_id vacío o NULL no es un chat al que se pueda escribir
+    sql = "user_id IS NOT NULL AND user_id <> ''"
+    params = ()
+    if tipo:
+        sql += " AND tipo_solicitud = %s"
+        params = (tipo,)
+    return sql, params
+
+def count_recipients(tipo=None):
+    where, params = _recipient_filter(tipo)
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(DISTINCT user_id) FROM requests WHERE {where}", params)
+        total = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        conn.close()
+    return total
+
+def fetch_recipients(after, limit, tipo=None):
+    """
+    Hasta `limit` user_id distintos mayores que `after`, en orden. Con el
+    índice sobre user_id cada lote es un recorrido corto del índice.
+    """
+    where, params = _recipient_filter(tipo)
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT DISTINCT user_id FROM requests WHERE {where} AND user_id > %s "
+            "ORDER BY user_id LIMIT %s",
+            params + (after, limit)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+# -------------------------------------------------------
+# CHECKPOINT
+# -------------------------------------------------------
+class Checkpoint:
+    """
+    Estado reanudable de un aviso: `after` es el último user_id de los lotes
+    ya terminados y el diario `<ruta>.batch` lista los user_id atendidos del
+    lote en curso con su resultado (una línea por envío, con fsync; se vacía
+    al cerrar cada lote). El diario existe desde el primer envío, antes de
+    que haya un checkpoint, así que una caída en el primer lote también se
+    reanuda sin repetir.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.journal_path = path + ".batch"
+        self.key = key
+        self.after = ""
+        self.counts = {}
+        self.finished = False
+        # user_id -> resultado ("sent", "blocked", "failed") del lote en curso
+        self.done_in_batch = {}
+        self._journal = None
+
+    def _check_key(self, key, path):
+        if key != self.key:
+            raise RuntimeError(
+                f"{path} es de otro aviso (mensaje o filtro distinto). "
+                "Usa --restart para descartarlo."
+            )
+
+    def load(self):
+        """Carga el avance previo del mismo aviso; False si no hay"""
+        found = False
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            self._check_key(state.get("key"), self.path)
+            self.after = state["after"]
+            self.counts = state["counts"]
+            self.finished = state.get("finished", False)
+            found = True
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding="utf-8") as f:
+                lines = [line.rstrip("\n") for line in f]
+            if lines and lines[0].startswith("#"):
+                self._check_key(lines[0][1:], self.journal_path)
+                lines = lines[1:]
+            for line in lines:
+                # Una última línea cortada por la caída no tiene resultado: se da por enviada
+                user_id, _, result = line.partition("\t")
+                if user_id:
+                    self.done_in_batch[user_id] = result if result in ("sent", "blocked", "failed") else "sent"
+            found = found or bool(self.done_in_batch)
+        return found
+
+    def batch_counts(self):
+        counts = {"sent": 0, "blocked": 0, "failed": 0}
+        for result in self.done_in_batch.values():
+            counts[result] += 1
+        return counts
+
+    def reset(self):
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def mark(self, user_id, result):
+        if self._journal is None:
+            new = not os.path.exists(self.journal_path)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+            if new:
+                self._journal.write(f"#{self.key}\n")
+        self._journal.write(f"{user_id}\t{result}\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def commit(self, after, counts, finished=False):
+        """Lote terminado: guarda el avance (reemplazo atómico) y vacía el diario"""
+        self.after = after
+        self.finished = finished
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "after": after, "counts": counts, "finished": finished}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.done_in_batch = {}
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+# -------------------------------------------------------
+# COLA DE SALIDA
+# -------------------------------------------------------
+class OutboundQueue:
+    """
+    Envía mensajes con `workers` tareas en paralelo sin pasar de `rate`
+    mensajes por segundo en total ni de uno cada `per_chat_interval` por chat.
+
+    Los turnos globales se reparten a intervalos fijos de 1/rate: cada envío
+    toma el siguiente turno libre y duerme hasta él. Un RetryAfter corre el
+    próximo turno libre, así que toda la cola espera lo que pidió Telegram.
+    """
+
+    def __init__(self, bot, text, parse_mode=None, rate=BROADCAST_RATE,
+                 per_chat_interval=BROADCAST_PER_CHAT_INTERVAL, workers=BROADCAST_WORKERS,
+                 max_attempts=BROADCAST_MAX_ATTEMPTS, on_done=None):
+        self.bot = bot
+        self.text = text
+        self.parse_mode = parse_mode
+        self.interval = 1 / rate
+        self.per_chat_interval = per_chat_interval
+        self.n_workers = workers
+        self.max_attempts = max_attempts
+        self.on_done = on_done
+        self.stats = {"sent": 0, "blocked": 0, "failed": 0, "retry_after": 0, "retries": 0}
+        self._queue = asyncio.Queue(maxsize=workers * 2)
+        self._next_slot = 0.0
+        self._chat_ready = {}
+        self._workers = []
+        self._fatal = None
+
+    def start(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.n_workers)]
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def send_all(self, chat_ids):
+        """Encola los chats y espera a que todos queden atendidos"""
+        for chat_id in chat_ids:
+            if self._fatal is not None:
+                break
+            await self._queue.put(chat_id)
+        await self._queue.join()
+        if self._fatal is not None:
+            raise self._fatal
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._queue.get()
+            try:
+                if self._fatal is None:
+                    result = await self._deliver(chat_id)
+                    # Cada chat recibe un solo aviso: ya no hace falta su límite
+                    self._chat_ready.pop(chat_id, None)
+                    self.stats[result] += 1
+                    if self.on_done is not None:
+                        self.on_done(chat_id, result)
+            except Exception as e:
+                # Error que no se arregla reintentando (token inválido, Markdown roto...)
+                if self._fatal is None:
+                    self._fatal = e
+            finally:
+                self._queue.task_done()
+
+    async def _wait_turn(self, chat_id):
+        loop = asyncio.get_running_loop()
+        # Primero el límite del chat (solo pesa en reintentos), luego el turno global
+        ready = self._chat_ready.get(chat_id, 0.0)
+        if ready > loop.time():
+            await asyncio.sleep(ready - loop.time())
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        self._chat_ready[chat_id] = slot + self.per_chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _pause(self, seconds):
+        resume = asyncio.get_running_loop().time() + seconds
+        self._next_slot = max(self._next_slot, resume)
+
+    async def _deliver(self, chat_id):
+        """'sent', 'blocked' (el usuario bloqueó al bot) o 'failed'"""
+        try:
+            target = int(chat_id)
+        except ValueError:
+            return "failed"
+        attempts = 0
+        while True:
+            await self._wait_turn(chat_id)
+            try:
+                await self.bot.send_message(chat_id=target, text=self.text, parse_mode=self.parse_mode)
+                return "sent"
+            except RetryAfter as e:
+                self.stats["retry_after"] += 1
+                self._pause(e.retry_after)
+            except Forbidden:
+                return "blocked"
+            except BadRequest as e:
+                if "parse entities" in str(e):
+                    raise
+                # Chat inexistente o user_id inválido
+                return "failed"
+            except NetworkError as e:
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    print(f"Error aviso: {chat_id} sin enviar tras {attempts} intentos: {e}")
+                    return "failed"
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(30, 2 ** attempts))
+
+
+# -------------------------------------------------------
+# EJECUCIÓN
+# -------------------------------------------------------
+def broadcast_key(text, parse_mode, tipo):
+    """Identifica un aviso para no reanudar un checkpoint con otro mensaje"""
+    raw = json.dumps([text, parse_mode, tipo or ""], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _format_progress(done, total, counts, elapsed, sent_now):
+    rate = sent_now / elapsed if elapsed else 0.0
+    remaining = max(0, total - done)
+    eta = f"{remaining / rate / 60:.1f} min" if rate else "?"
+    pct = 100 * done / total if total else 100.0
+    return (f"📣 {done}/{total} ({pct:.1f}%)  enviados={counts['sent']} "
+            f"bloqueados={counts['blocked']} fallidos={counts['failed']}  "
+            f"{rate:.1f} msg/s  faltan ~{eta}")
+
+async def run_broadcast(bot, text, parse_mode=None, tipo=None, checkpoint_path=BROADCAST_CHECKPOINT,
+                        restart=False, batch_size=BROADCAST_BATCH_SIZE, rate=BROADCAST_RATE,
+                        workers=BROADCAST_WORKERS):
+    """Envía `text` a cada destinatario una sola vez; devuelve los conteos finales"""
+    checkpoint = Checkpoint(checkpoint_path, broadcast_key(text, parse_mode, tipo))
+    if restart:
+        checkpoint.reset()
+    elif checkpoint.load():
+        if checkpoint.finished:
+            print(f"Este aviso ya se completó ({checkpoint.counts}). Usa --restart para reenviarlo.")
+            return checkpoint.counts
+        print(f"Reanudando después de user_id={checkpoint.after!r} ({checkpoint.counts}, "
+              f"{len(checkpoint.done_in_batch)} ya atendidos del lote en curso)")
+
+    loop = asyncio.get_running_loop()
+    total = await loop.run_in_executor(None, count_recipients, tipo)
+    # Lo ya atendido antes de la caída: lotes confirmados más el diario del lote en curso
+    previous = {"sent": 0, "blocked": 0, "failed": 0, **checkpoint.counts}
+    for key, value in checkpoint.batch_counts().items():
+        previous[key] += value
+    already_done = sum(previous.values())
+
+    def on_done(chat_id, result):
+        checkpoint.mark(chat_id, result)
+
+    queue = OutboundQueue(bot, text, parse_mode, rate=rate, workers=workers, on_done=on_done)
+    metrics.register_collector("csdc_broadcast", lambda: {**queue.stats, "total": total})
+
+    def counts():
+        return {key: previous[key] + queue.stats[key] for key in ("sent", "blocked", "failed")}
+
+    started = time.perf_counter()
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(BROADCAST_PROGRESS_SECONDS)
+            current = counts()
+            done = already_done + sum(queue.stats[key] for key in ("sent", "blocked", "failed"))
+            print(_format_progress(done, total, current, time.perf_counter() - started, queue.stats["sent"]))
+
+    queue.start()
+    reporter = asyncio.create_task(report_progress())
+    try:
+        after = checkpoint.after
+        batch = await loop.run_in_executor(None, fetch_recipients, after, batch_size, tipo)
+        while batch:
+            # El siguiente lote se lee mientras se envía el actual
+            next_batch = loop.run_in_executor(None, fetch_recipients, batch[-1], batch_size, tipo)
+            pending = [user_id for user_id in batch if user_id not in checkpoint.done_in_batch]
+            await queue.send_all(pending)
+            after = batch[-1]
+            checkpoint.commit(after, counts())
+            batch = await next_batch
+        checkpoint.commit(after, counts(), finished=True)
+    finally:
+        reporter.cancel()
+        await queue.close()
+        checkpoint.close()
+
+    final = counts()
+    elapsed = time.perf_counter() - started
+    print(_format_progress(total, total, final, elapsed, queue.stats["sent"]))
+    print(f"✅ Aviso terminado en {elapsed:.0f}s: {final} (RetryAfter: {queue.stats['retry_after']})")
+    return final
+
+
+async def _main_async(args, text):
+    metrics.start()
+    # Un socket por envío en vuelo
+    request = HTTPXRequest(connection_pool_size=args.workers)
+    async with Bot(os.getenv("TELEGRAM_TOKEN"), request=request) as bot:
+        await run_broadcast(
+            bot, text, parse_mode=None if args.parse_mode == "none" else args.parse_mode,
+            tipo=args.tipo, checkpoint_path=args.checkpoint, restart=args.restart,
+            rate=args.rate, workers=args.workers
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Enviar un aviso por Telegram a quienes registraron solicitudes")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--message", help="texto del aviso")
+    source.add_argument("--message-file", help="archivo con el texto del aviso")
+    parser.add_argument("--parse-mode", choices=["Markdown", "HTML", "none"], default="Markdown")
+    parser.add_argument("--tipo", help="solo quienes registraron este tipo de solicitud")
+    parser.add_argument("--rate", type=float, default=BROADCAST_RATE, help="mensajes por segundo")
+    parser.add_argument("--workers", type=int, default=BROADCAST_WORKERS)
+    parser.add_argument("--checkpoint", default=BROADCAST_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="ignora el checkpoint y empieza de cero")
+    parser.add_argument("--dry-run", action="store_true", help="solo cuenta los destinatarios")
+    args = parser.parse_args()
+
+    if args.message_file:
+        with open(args.message_file, encoding="utf-8") as f:
+            text = f.read().strip()
+    else:
+        text = args.message.strip()
+    if not text or len(text) > MAX_MESSAGE_LENGTH:
+        parser.error(f"el aviso debe tener entre 1 y {MAX_MESSAGE_LENGTH} caracteres")
+
+    if args.dry_run:
+        total = count_recipients(args.tipo)
+        print(f"Destinatarios: {total} (~{total / args.rate / 60:.1f} min a {args.rate:g} msg/s)")
+        return
+    asyncio.run(_main_async(args, text))
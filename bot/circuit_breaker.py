@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# Valor numérico del estado para las métricas
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Disyuntor para una dependencia externa.
+
+    Cerrado: deja pasar todo y anota el resultado de cada llamada en una
+    ventana de `window_seconds`. Con al menos `min_calls` llamadas en la
+    ventana, se abre si la fracción de errores llega a `error_rate` o la de
+    llamadas lentas (más de `slow_call_seconds`) llega a `slow_call_rate`.
+
+    Abierto: allow() devuelve False sin llamar a nadie durante `open_seconds`.
+    Después pasa a semiabierto y deja pasar hasta `half_open_probes` llamadas
+    de prueba: si salen bien (y rápido) se cierra, si no vuelve a abrirse.
+
+    Quien recibe True de allow() debe llamar después a record() con el
+    resultado, o a release() si al final no llegó a hacer la llamada (también
+    si se cancela). Por si acaso, una prueba sin resultado después de
+    `probe_timeout` segundos deja de ocupar su lugar.
+    """
+
+    def __init__(self, window_seconds=30.0, min_calls=10, error_rate=0.5, slow_call_seconds=6.0,
+                 slow_call_rate=0.8, open_seconds=30.0, half_open_probes=1, probe_timeout=60.0,
+                 clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.probe_timeout = probe_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self._opened_at = 0.0
+        # Momento en que empezó cada prueba en curso del estado semiabierto
+        self._probes = []
+        # (momento, falló, fue lenta) de las llamadas recientes
+        self._calls = deque()
+        self._failures = 0
+        self._slow = 0
+        self._lock = threading.Lock()
+        self.stats = {"trips": 0, "rejected": 0, "probes": 0, "expired_probes": 0}
+
+    def allow(self):
+        """True si se puede llamar a la dependencia ahora"""
+        with self._lock:
+            now = self.clock()
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self.stats["rejected"] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = []
+            if self.state == HALF_OPEN:
+                # Pruebas que nunca informaron su resultado
+                alive = [t for t in self._probes if now - t < self.probe_timeout]
+                self.stats["expired_probes"] += len(self._probes) - len(alive)
+                self._probes = alive
+                if len(self._probes) >= self.half_open_probes:
+                    self.stats["rejected"] += 1
+                    return False
+                self._probes.append(now)
+                self.stats["probes"] += 1
+            return True
+
+    def release(self):
+        """La llamada autorizada no se hizo (p. ej. cola llena): no cuenta como resultado"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes:
+                self._probes.pop(0)
+
+    def record(self, ok, seconds):
+        """Resultado de una llamada autorizada por allow()"""
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if self._probes:
+                    self._probes.pop(0)
+                if ok and not slow:
+                    self._close()
+                else:
+                    self._open()
+                return
+            if self.state == OPEN:
+                # Llamadas que empezaron antes de abrir el circuito
+                return
+
+            now = self.clock()
+            self._calls.append((now, not ok, slow))
+            self._failures += not ok
+            self._slow += slow
+            self._prune(now)
+            total = len(self._calls)
+            if total >= self.min_calls and (
+                self._failures / total >= self.error_rate or self._slow / total >= self.slow_call_rate
+            ):
+                self._open()
+
+    def _prune(self, now):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            _, failed, slow = self._calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self.clock()
+        self.stats["trips"] += 1
+        self._reset_window()
+
+    def _close(self):
+        self.state = CLOSED
+        self._reset_window()
+
+    def _reset_window(self):
+        self._calls.clear()
+        self._failures = 0
+        self._slow = 0
+
+    def get_stats(self):
+        with self._lock:
+            self._prune(self.clock())
+            total = len(self._calls)
+            return {
+                "state": STATE_CODES[self.state],
+                "window_calls": total,
+                "window_error_rate": self._failures / total if total else 0.0,
+                "window_slow_rate": self._slow / total if total else 0.0,
+                **self.stats,
+            }
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+import time
+from dotenv import load_dotenv
+from bot.db import insert_conversations_async
+from bot.metrics import register_collector
+
+load_dotenv()
+
+CONVERSATION_LOG_ENABLED = os.getenv("CONVERSATION_LOG_ENABLED", "1") == "1"
+CONVERSATION_QUEUE_SIZE = int(os.getenv("CONVERSATION_QUEUE_SIZE", "10000"))
+CONVERSATION_BATCH_SIZE = int(os.getenv("CONVERSATION_BATCH_SIZE", "200"))
+CONVERSATION_FLUSH_MS = float(os.getenv("CONVERSATION_FLUSH_MS", "1000"))
+# Filas que pueden esperar en memoria cuando la cola está llena; las demás se descartan
+CONVERSATION_OVERFLOW_SIZE = int(os.getenv("CONVERSATION_OVERFLOW_SIZE", "10000"))
+# Archivo local donde van las filas que no caben en la cola o que fallan al insertar
+CONVERSATION_SPILL_PATH = os.getenv("CONVERSATION_SPILL_PATH", "conversations_spill.jsonl")
+
+
+class ConversationLogger:
+    """
+    Registro no bloqueante de la tabla conversations.
+
+    log() solo encola (nunca espera) y anota la hora del mensaje, que es la que
+    queda en la tabla aunque la fila se inserte mucho después. Una tarea de
+    fondo vacía la cola en lotes con un INSERT múltiple. Si la cola está llena
+    o la base de datos falla, las filas se escriben en un archivo local (o se
+    descartan si no hay archivo), para no frenar las respuestas del bot; si
+    también se llena el desborde en memoria, se descartan. La escritura de ese archivo corre en
+    el executor, y sus filas se reinsertan al arrancar y después de cada lote
+    que entra bien (al menos una vez: si el proceso muere a mitad de la
+    reinserción, algunas pueden quedar repetidas).
+    """
+
+    def __init__(self, max_queue=CONVERSATION_QUEUE_SIZE, batch_size=CONVERSATION_BATCH_SIZE,
+                 flush_interval=CONVERSATION_FLUSH_MS / 1000, spill_path=CONVERSATION_SPILL_PATH,
+                 insert_batch=insert_conversations_async, max_overflow=CONVERSATION_OVERFLOW_SIZE):
+        self.batch_size = batch_size
+        self.max_overflow = max_overflow
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.insert_batch = insert_batch
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        # Filas que no cupieron en la cola; la tarea de fondo las pasa al archivo
+        self._overflow = []
+        # Hay (o puede haber) filas en el archivo esperando reinsertarse
+        self._spill_pending = bool(spill_path)
+        self._task = None
+        self.stats = {
+            "queued": 0, "flushed": 0, "dropped": 0, "spilled": 0, "replayed": 0, "batches": 0
+        }
+
+    def log(self, user_id, message, response):
+        row = (str(user_id), message, response, time.time())
+        try:
+            self._queue.put_nowait(row)
+            self.stats["queued"] += 1
+        except asyncio.QueueFull:
+            if len(self._overflow) < self.max_overflow:
+                self._overflow.append(row)
+            else:
+                self.stats["dropped"] += 1
+
+    async def _spill_async(self, rows):
+        if not rows:
+            return
+        if self.spill_path:
+            self._spill_pending = True
+        await asyncio.get_running_loop().run_in_executor(None, self._spill, rows)
+
+    def _spill(self, rows):
+        if not self.spill_path:
+            self.stats["dropped"] += len(rows)
+            return
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self.stats["spilled"] += len(rows)
+        except OSError as e:
+            print(f"Error log conversaciones: {e}")
+            self.stats["dropped"] += len(rows)
+
+    async def _next_batch(self):
+        """Junta hasta batch_size filas o lo que llegue en flush_interval"""
+        batch = []
+        item = await self._queue.get()
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while item is not None:
+            batch.append(item)
+            remaining = deadline - asyncio.get_running_loop().time()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch, False
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return batch, False
+        # None es la señal de cierre
+        return batch, True
+
+    async def _write(self, batch):
+        """True si el lote quedó en la base de datos"""
+        if not batch:
+            return False
+        try:
+            await self.insert_batch(batch)
+            self.stats["flushed"] += len(batch)
+            self.stats["batches"] += 1
+            return True
+        except Exception as e:
+            print(f"Error DB (conversaciones): {e}")
+            await self._spill_async(batch)
+            return False
+
+    def _take_spill(self):
+        """
+        Aparta el archivo de respaldo (lo que se derrame mientras tanto va a
+        uno nuevo) y devuelve sus filas, o None si no hay archivo. Un apartado
+        que quedó de una reinserción interrumpida se retoma primero.
+        """
+        replay_path = self.spill_path + ".replay"
+        if not os.path.exists(replay_path):
+            try:
+                os.replace(self.spill_path, replay_path)
+            except FileNotFoundError:
+                return None
+        rows = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    user_id, message, response, logged_at = json.loads(line)
+                except ValueError:
+                    # Línea a medio escribir si el proceso murió derramando
+                    continue
+                rows.append((user_id, message, response, logged_at))
+        return rows
+
+    def _finish_replay(self, rows):
+        """Devuelve True si el archivo de respaldo todavía tiene filas"""
+        # Lo que no entró vuelve al archivo de respaldo antes de soltar el apartado
+        if rows:
+            self._spill(rows)
+        os.remove(self.spill_path + ".replay")
+        return os.path.exists(self.spill_path)
+
+    async def _replay_spill(self):
+        loop = asyncio.get_running_loop()
+        self._spill_pending = False
+        try:
+            rows = await loop.run_in_executor(None, self._take_spill)
+        except OSError as e:
+            print(f"Error log conversaciones: {e}")
+            return
+        if rows is None:
+            return
+        pending = rows
+        while pending:
+            chunk = pending[:self.batch_size]
+            try:
+                await self.insert_batch(chunk)
+            except Exception as e:
+                print(f"Error DB (conversaciones): {e}")
+                break
+            self.stats["replayed"] += len(chunk)
+            pending = pending[self.batch_size:]
+        try:
+            self._spill_pending = await loop.run_in_executor(None, self._finish_replay, pending)
+        except OSError as e:
+            print(f"Error log conversaciones: {e}")
+
+    async def _run(self):
+        if self._spill_pending:
+            await self._replay_spill()
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            written = await self._write(batch)
+            overflow, self._overflow = self._overflow, []
+            await self._spill_async(overflow)
+            if written and self._spill_pending:
+                await self._replay_spill()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Envía lo que quede en la cola y detiene la tarea de fondo"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["pending"] = self._queue.qsize() + len(self._overflow)
+        return stats
+
+
+conversation_logger = ConversationLogger()
+register_collector("csdc_conversation_log", conversation_logger.get_stats)
+
+def configure_worker(index):
+    """En modo webhook cada proceso worker usa su propio archivo de respaldo"""
+    if conversation_logger.spill_path:
+        root, ext = os.path.splitext(conversation_logger.spill_path)
+        conversation_logger.spill_path = f"{root}.{index}{ext}"
+
+def log_conversation(user_id, message, response):
+    if CONVERSATION_LOG_ENABLED:
+        conversation_logger.log(user_id, message, response)
@@ -1,11 +1,61 @@
+import asyncio
+import atexit
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from bot.metrics import register_collector, track_external
 
 load_dotenv()
 
-def get_connection():
-    return mysql.connector.connect(
+# Configuración del pool (compartido por el bot y el dashboard)
+POOL_NAME = os.getenv("MYSQL_POOL_NAME", "csdc_pool")
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+POOL_RETRY_INTERVAL = 0.01
+
+# Escritura diferida opcional: INSERTs agrupados con diario local
+WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_DIR = os.getenv("DB_WRITE_BEHIND_DIR", "write_behind_journal")
+WRITE_BEHIND_ROWS = int(os.getenv("DB_WRITE_BEHIND_ROWS", "100"))
+WRITE_BEHIND_MS = float(os.getenv("DB_WRITE_BEHIND_MS", "200"))
+# Fallos seguidos de un lote antes de reintentarlo fila por fila
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("DB_WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+# Errores de conexión: el lote se reintenta completo más tarde
+TRANSIENT_DB_ERRORS = (InterfaceError, OperationalError, PoolError)
+
+INSERT_REQUEST_SQL = """
+    INSERT INTO requests (user_id, nombre, correo, tipo_solicitud, detalle)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+# Largo máximo de cada columna VARCHAR de requests (ver csdc_chatbot.sql)
+REQUEST_COLUMN_LIMITS = {"user_id": 50, "nombre": 150, "correo": 150, "tipo_solicitud": 150}
+
+_pool = None
+_pool_lock = threading.Lock()
+_write_behind = None
+
+# Executor acotado para escrituras desde el event loop del bot.
+# Un hilo por conexión del pool: nunca hay más escrituras en vuelo que conexiones.
+_db_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="csdc-db")
+
+# Métricas de espera del pool
+_stats_lock = threading.Lock()
+_pool_stats = {
+    "checkouts": 0,
+    "wait_total_ms": 0.0,
+    "wait_max_ms": 0.0,
+    "timeouts": 0,
+    "reconnects": 0,
+    "discarded": 0,
+}
+
+def _db_config():
+    return dict(
         host=os.getenv("MYSQLHOST"),
         user=os.getenv("MYSQLUSER"),
         password=os.getenv("MYSQLPASSWORD"),
@@ -13,16 +63,192 @@ def get_connection():
         port=int(os.getenv("MYSQLPORT"))
     )
 
-def register_request(user_id, nombre, correo, tipo_solicitud, detalle):
-    conn = get_connection()
-    cursor = conn.cursor()
+def get_pool():
+    """Crea el pool la primera vez que se usa (perezoso, seguro entre hilos)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=POOL_NAME,
+                    pool_size=POOL_SIZE,
+                    pool_reset_session=True,
+                    **_db_config()
+                )
+    return _pool
 
-    sql = """
-        INSERT INTO requests (user_id, nombre, correo, tipo_solicitud, detalle)
-        VALUES (%s, %s, %s, %s, %s)
+def _record_checkout(wait_ms):
+    with _stats_lock:
+        _pool_stats["checkouts"] += 1
+        _pool_stats["wait_total_ms"] += wait_ms
+        if wait_ms > _pool_stats["wait_max_ms"]:
+            _pool_stats["wait_max_ms"] = wait_ms
+
+def _ensure_alive(conn):
+    """Health check al sacar la conexión: si está caída, reconecta"""
+    try:
+        conn.ping(reconnect=False)
+    except mysql.connector.Error:
+        conn.reconnect(attempts=3, delay=0.2)
+        with _stats_lock:
+            _pool_stats["reconnects"] += 1
+
+def _discard(pool, conn):
+    """
+    Saca del pool una conexión que no revivió: cierra su socket y deja en su
+    lugar una conexión nueva sin abrir, que el pool conecta al entregarla.
+    """
+    cnx = conn._cnx
+    # Sin esto, close() la devolvería rota al pool
+    conn._cnx = None
+    try:
+        cnx.disconnect()
+    except (mysql.connector.Error, OSError):
+        pass
+    pool.add_connection(cnx.__class__())
+    with _stats_lock:
+        _pool_stats["discarded"] += 1
+
+def get_connection():
     """
-    cursor.execute(sql, (user_id, nombre, correo, tipo_solicitud, detalle))
+    Devuelve una conexión del pool. Llamar a close() la regresa al pool.
+    Si el pool está agotado espera hasta MYSQL_POOL_TIMEOUT segundos.
+    """
+    pool = get_pool()
+    started = time.perf_counter()
+    deadline = started + POOL_TIMEOUT
+
+    while True:
+        try:
+            conn = pool.get_connection()
+            break
+        except PoolError:
+            if time.perf_counter() >= deadline:
+                with _stats_lock:
+                    _pool_stats["timeouts"] += 1
+                raise
+            time.sleep(POOL_RETRY_INTERVAL)
 
-    conn.commit()
-    cursor.close()
-    conn.close()
+    _record_checkout((time.perf_counter() - started) * 1000)
+
+    try:
+        _ensure_alive(conn)
+    except mysql.connector.Error:
+        _discard(pool, conn)
+        raise
+    return conn
+
+def get_pool_stats():
+    """Copia de las métricas del pool (espera promedio/máxima, timeouts, reconexiones)"""
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    checkouts = stats["checkouts"]
+    stats["wait_avg_ms"] = stats["wait_total_ms"] / checkouts if checkouts else 0.0
+    stats["pool_size"] = POOL_SIZE
+    return stats
+
+register_collector("csdc_mysql_pool", get_pool_stats)
+register_collector(
+    "csdc_write_behind", lambda: _write_behind.get_stats() if _write_behind is not None else {}
+)
+
+def validate_request_row(user_id, nombre, correo, tipo_solicitud):
+    """ValueError si algún campo no cabe en su columna (MySQL lo rechazaría)"""
+    values = {"user_id": user_id, "nombre": nombre, "correo": correo, "tipo_solicitud": tipo_solicitud}
+    for column, limit in REQUEST_COLUMN_LIMITS.items():
+        value = values[column]
+        if value is not None and len(str(value)) > limit:
+            raise ValueError(f"{column} supera {limit} caracteres")
+
+def register_request(user_id, nombre, correo, tipo_solicitud, detalle):
+    validate_request_row(user_id, nombre, correo, tipo_solicitud)
+    row = (user_id, nombre, correo, tipo_solicitud, detalle)
+    if WRITE_BEHIND:
+        # Vuelve cuando la fila está en el diario; el INSERT va en el próximo lote
+        get_write_behind().append(row)
+        return
+
+    with track_external("mysql", "insert_request"):
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(INSERT_REQUEST_SQL, row)
+
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+def register_requests_batch(rows):
+    """Inserta varias solicitudes con executemany en una sola transacción"""
+    with track_external("mysql", "insert_requests_batch"):
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(INSERT_REQUEST_SQL, [tuple(r) for r in rows])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+def configure_worker(index):
+    """En modo webhook cada proceso worker lleva su propio diario de escritura diferida"""
+    global WRITE_BEHIND_DIR
+    WRITE_BEHIND_DIR = f"{WRITE_BEHIND_DIR.rstrip(os.sep)}.{index}"
+
+def get_write_behind():
+    """Writer de escritura diferida (se crea y recupera su diario al primer uso)"""
+    global _write_behind
+    if _write_behind is None:
+        with _pool_lock:
+            if _write_behind is None:
+                from bot.write_behind import WriteBehindWriter
+                _write_behind = WriteBehindWriter(
+                    WRITE_BEHIND_DIR,
+                    register_requests_batch,
+                    flush_rows=WRITE_BEHIND_ROWS,
+                    flush_interval=WRITE_BEHIND_MS / 1000,
+                    transient_errors=TRANSIENT_DB_ERRORS,
+                    max_attempts=WRITE_BEHIND_MAX_ATTEMPTS
+                )
+                atexit.register(_write_behind.close)
+    return _write_behind
+
+def insert_conversations(rows):
+    """Inserta un lote de (user_id, message, response, epoch del mensaje) en conversations"""
+    with track_external("mysql", "insert_conversations"):
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(
+                    "INSERT INTO conversations (user_id, message, response, timestamp) "
+                    "VALUES (%s, %s, %s, FROM_UNIXTIME(%s))",
+                    rows
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+async def insert_conversations_async(rows):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_db_executor, insert_conversations, rows)
+
+async def register_request_async(user_id, nombre, correo, tipo_solicitud, detalle):
+    """Versión awaitable de register_request: el INSERT corre en el executor de BD"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        _db_executor,
+        register_request,
+        user_id, nombre, correo, tipo_solicitud, detalle
+    )
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import numpy as np
+from scipy import sparse
+from bot.intents import FAQ_INTENTS
+from bot.text_utils import normalize_message
+
+FAQ_CORPUS_PATH = os.getenv(
+    "FAQ_CORPUS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_corpus.json")
+)
+# Similitud coseno mínima para responder localmente sin ir a la IA
+FAQ_MIN_SCORE = float(os.getenv("FAQ_MIN_SCORE", "0.65"))
+# Umbral más permisivo cuando la IA no está disponible (mejor algo cercano que nada)
+FAQ_FALLBACK_MIN_SCORE = float(os.getenv("FAQ_FALLBACK_MIN_SCORE", "0.35"))
+NGRAM_RANGE = (3, 5)
+
+
+def char_ngrams(text, ngram_range=NGRAM_RANGE):
+    """N-gramas de caracteres por palabra (con bordes), tolerantes a faltas de ortografía"""
+    grams = []
+    low, high = ngram_range
+    for word in normalize_message(text).split():
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            if len(padded) < n:
+                break
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+class FaqIndex:
+    """
+    Índice TF-IDF de n-gramas de caracteres sobre las preguntas del corpus.
+    Las filas de la matriz están normalizadas (L2), así que el producto
+    punto de una consulta contra la matriz es directamente la similitud coseno.
+    """
+
+    def __init__(self, questions, answers):
+        self.answers = list(answers)
+        self.vocabulary = {}
+        docs = [self._count(q, grow=True) for q in questions]
+
+        n_docs = len(docs)
+        df = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for counts in docs:
+            df[list(counts)] += 1
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+        self.matrix = self._to_matrix(docs).T.tocsr()
+
+    def _count(self, text, grow=False):
+        counts = {}
+        for gram in char_ngrams(text):
+            col = self.vocabulary.get(gram)
+            if col is None:
+                if not grow:
+                    continue
+                col = self.vocabulary[gram] = len(self.vocabulary)
+            counts[col] = counts.get(col, 0) + 1
+        return counts
+
+    def _to_matrix(self, docs):
+        indptr = [0]
+        indices = []
+        values = []
+        for counts in docs:
+            indices.extend(counts.keys())
+            values.extend(counts.values())
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), indices, indptr),
+            shape=(len(docs), len(self.vocabulary)),
+            dtype=np.float32
+        )
+        # TF sublineal * IDF y normalización L2 por fila
+        matrix.data = 1 + np.log(matrix.data)
+        matrix = matrix.multiply(self.idf).tocsr()
+        norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+    def search(self, messages, min_score=FAQ_MIN_SCORE):
+        """
+        Búsqueda por lotes: devuelve una lista con (respuesta, score) o None
+        por cada mensaje, según supere el umbral de confianza.
+        """
+        if not messages:
+            return []
+        queries = self._to_matrix([self._count(m) for m in messages])
+        scores = (queries @ self.matrix).toarray()
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(messages)), best]
+
+        results = []
+        for idx, score in zip(best, best_scores):
+            if score >= min_score:
+                results.append((self.answers[idx], float(score)))
+            else:
+                results.append(None)
+        return results
+
+
+def load_corpus(path=FAQ_CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    questions = []
+    answers = []
+    for entry in entries:
+        # Las entradas pueden reutilizar una respuesta de FAQ_INTENTS
+        answer = FAQ_INTENTS[entry["intent"]] if "intent" in entry else entry["answer"]
+        questions.append(entry["question"])
+        answers.append(answer)
+    return questions, answers
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_faq_index():
+    """Índice construido una sola vez por proceso"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FaqIndex(*load_corpus())
+    return _index
+
+def find_faq_answer(message, min_score=FAQ_MIN_SCORE):
+    """Respuesta local para el mensaje, o None si la confianza es baja"""
+    if not message.strip():
+        return None
+    result = get_faq_index().search([message], min_score)[0]
+    return result[0] if result else None
@@ -1,73 +1,124 @@
+import time
 from bot.intents import classify_intent, FAQ_INTENTS
-from bot.db import register_request
+from bot.db import register_request_async, REQUEST_COLUMN_LIMITS
+from bot.faq_retrieval import find_faq_answer, FAQ_FALLBACK_MIN_SCORE
+from bot.session_store import Session, create_session_store
+from bot.metrics import CLASSIFY_SECONDS, FLOW_STEP_SECONDS, ROUTE_SECONDS, register_collector
 
-# Estado temporal del usuario
-user_states = {}
+# Estado temporal del usuario (con TTL, tope LRU y backend opcional en SQLite)
+user_states = create_session_store()
+register_collector("csdc_sessions", user_states.get_stats)
+
+# Nombre de cada paso del flujo para las métricas
+FLOW_STEP_NAMES = {1: "nombre", 2: "correo", 3: "tipo", 4: "detalle", 5: "confirmacion"}
+
+DEGRADED_NOTICE = (
+    "⚠️ _El asistente de IA no está disponible en este momento. / "
+    "The AI assistant is unavailable right now._\n\n"
+)
 
 def start_request_flow(user_id):
-    user_states[user_id] = {
-        "step": 1,
-        "data": {
-            "nombre": "",
-            "correo": "",
-            "tipo_solicitud": "",
-            "detalle": ""
-        }
-    }
+    user_states.save(user_id, Session())
 
 def cancel_request_flow(user_id):
-    if user_id in user_states:
-        del user_states[user_id]
-        return True
-    return False
+    return user_states.delete(user_id)
 
 def revert_step(user_id):
     """Retrocede un paso en el flujo"""
-    if user_id in user_states:
-        current_step = user_states[user_id]["step"]
-        if current_step > 1:
-            user_states[user_id]["step"] -= 1
-            return user_states[user_id]["step"]
+    session = user_states.get(user_id)
+    if session is not None:
+        if session.step > 1:
+            session.step -= 1
+            user_states.save(user_id, session)
+            return session.step
     return 1
 
+def set_request_type(user_id, tipo):
+    """Paso 3: guarda el tipo elegido con los botones y avanza al detalle"""
+    with FLOW_STEP_SECONDS.time("tipo"):
+        session = user_states.get(user_id)
+        if session is None:
+            return False
+        session.tipo_solicitud = tipo
+        session.step = 4
+        user_states.save(user_id, session)
+        return True
+
 def get_summary(user_id):
     """Devuelve los datos actuales para la ficha resumen"""
-    if user_id in user_states:
-        return user_states[user_id]["data"]
+    session = user_states.get(user_id)
+    if session is not None:
+        return session.data()
     return None
 
 def process_message(user_id, text):
+    started = time.perf_counter()
+    route, response = _route_message(user_id, text)
+    ROUTE_SECONDS.observe(time.perf_counter() - started, route)
+    return response
+
+def _route_message(user_id, text):
+    """(ruta para métricas, respuesta)"""
     # Si el usuario está registrando una solicitud
-    if user_id in user_states:
-        return handle_request_flow(user_id, text)
+    session = user_states.get(user_id)
+    if session is not None:
+        return "flujo", handle_request_flow(user_id, text, session)
 
     # Intentos FAQ
-    intent = classify_intent(text)
+    with CLASSIFY_SECONDS.time():
+        intent = classify_intent(text)
     if intent in FAQ_INTENTS:
-        return FAQ_INTENTS[intent]
+        return intent, FAQ_INTENTS[intent]
 
     # Iniciar solicitud desde intención
     if intent == "registrar_solicitud":
         start_request_flow(user_id)
-        return "__START_FLOW__"
+        return intent, "__START_FLOW__"
 
-    # Fallback → IA
-    return "__AI_FALLBACK__"
+    # Búsqueda local en el corpus de FAQ antes de gastar una llamada a la IA
+    local_answer = find_faq_answer(text)
+    if local_answer:
+        return "faq_corpus", local_answer
 
-def handle_request_flow(user_id, text):
-    state = user_states[user_id]
-    step = state["step"]
+    # Fallback → IA
+    return "ia", "__AI_FALLBACK__"
+
+def local_fallback_answer(text):
+    """
+    Mejor respuesta local cuando la IA no está disponible: la FAQ más
+    parecida (con un umbral más bajo que el normal) o, si no hay ninguna
+    cercana, la información general para que el usuario siga con el menú.
+    """
+    answer = find_faq_answer(text, min_score=FAQ_FALLBACK_MIN_SCORE)
+    if answer is None:
+        answer = FAQ_INTENTS["informacion"]
+    return DEGRADED_NOTICE + answer
+
+def handle_request_flow(user_id, text, session=None):
+    if session is None:
+        session = user_states.get(user_id)
+    with FLOW_STEP_SECONDS.time(FLOW_STEP_NAMES.get(session.step, "otro")):
+        return _advance_flow(user_id, text, session)
+
+def _advance_flow(user_id, text, session):
+    step = session.step
 
     # Paso 1: Guardar Nombre -> Ir a Paso 2
     if step == 1:
-        state["data"]["nombre"] = text
-        state["step"] = 2
+        if len(text) > REQUEST_COLUMN_LIMITS["nombre"]:
+            return f"⚠️ El nombre puede tener hasta {REQUEST_COLUMN_LIMITS['nombre']} caracteres. Escríbelo de nuevo:"
+        session.nombre = text
+        session.step = 2
+        user_states.save(user_id, session)
         return f"Gracias, *{text}*. 👋\n\n📧 Indícame tu *correo electrónico institucional*:"
 
     # Paso 2: Guardar Correo -> Ir a Paso 3 (Menú Tipo)
     if step == 2:
-        state["data"]["correo"] = text
-        state["step"] = 3
+        if len(text) > REQUEST_COLUMN_LIMITS["correo"]:
+            return f"⚠️ El correo puede tener hasta {REQUEST_COLUMN_LIMITS['correo']} caracteres. Escríbelo de nuevo:"
+        session.correo = text
+        session.step = 3
+        user_states.save(user_id, session)
         return "__SHOW_TIPO_MENU__"
 
     # Paso 3: Selección de Tipo (Se hace vía botones, no texto)
@@ -76,8 +127,9 @@ def handle_request_flow(user_id, text):
 
     # Paso 4: Guardar Detalle -> Ir a Paso 5 (Resumen/Confirmación)
     if step == 4:
-        state["data"]["detalle"] = text
-        state["step"] = 5  # Nuevo paso de confirmación
+        session.detalle = text
+        session.step = 5  # Nuevo paso de confirmación
+        user_states.save(user_id, session)
         return "__SHOW_SUMMARY__"
 
     # Paso 5: Esperando confirmación (Botón), si escriben texto lo ignoramos o pedimos botón
@@ -86,22 +138,30 @@ def handle_request_flow(user_id, text):
 
     return "Error de estado. Escribe /start para reiniciar."
 
-def confirm_and_save(user_id):
+async def confirm_and_save(user_id):
     """Función final llamada por el botón de Confirmar"""
-    if user_id not in user_states:
+    with FLOW_STEP_SECONDS.time("enviar"):
+        return await _confirm_and_save(user_id)
+
+async def _confirm_and_save(user_id):
+    # Sacamos el estado antes de esperar la escritura: un doble clic en
+    # "Enviar" mientras el INSERT está en vuelo no duplica la solicitud.
+    session = user_states.pop(user_id)
+    if session is None:
         return False
-    
-    data = user_states[user_id]["data"]
+
     try:
-        register_request(
+        await register_request_async(
             user_id,
-            data["nombre"],
-            data["correo"],
-            data["tipo_solicitud"],
-            data["detalle"]
+            session.nombre,
+            session.correo,
+            session.tipo_solicitud,
+            session.detalle
         )
-        del user_states[user_id]
         return True
     except Exception as e:
         print(f"Error DB: {e}")
+        # Restauramos el estado para que el usuario pueda reintentar
+        if user_id not in user_states:
+            user_states.save(user_id, session)
         return False
\ No newline at end of file
@@ -1,3 +1,6 @@
+import re
+from bot.text_utils import fold_accents
+
 FAQ_INTENTS = {
     "horario": (
         "🕒 *Horario de Atención CSDC*\n\n"
@@ -23,19 +26,70 @@ FAQ_INTENTS = {
     )
 }
 
-def classify_intent(message: str):
-    msg = message.lower()
+# Tabla declarativa de palabras clave: (raíz sin tildes, peso).
+#
+# Puntaje: cada raíz se busca al inicio de palabra ("hora" casa con "horas"
+# pero no con "ahora"); donde calzan dos raíces cuenta solo la más larga
+# ("horario" no suma además "hora"). Los pesos de todas las raíces encontradas
+# se suman por intención y gana la de mayor puntaje; los empates los decide el
+# orden de la tabla. Sin ninguna raíz, la intención es "otro".
+#
+# La cadena de `if` anterior devolvía la primera intención con cualquier
+# coincidencia, aunque fuera dentro de otra palabra: "ahora quiero una
+# solicitud" era "horario" y ahora es "registrar_solicitud".
+INTENT_KEYWORDS = {
+    "horario": [("horario", 2), ("hora", 1), ("abierto", 1), ("abren", 1), ("cierran", 1)],
+    "requisitos": [("requisito", 2), ("documento", 1), ("necesito", 1)],
+    "informacion": [("informacion", 2), ("ayuda", 1)],
+    "registrar_solicitud": [("solicitud", 2), ("tramite", 2), ("constancia", 2)],
+}
+
+_INTENT_PRIORITY = {intent: i for i, intent in enumerate(INTENT_KEYWORDS)}
+
+_WEIGHTS = {
+    keyword: (intent, weight)
+    for intent, keywords in INTENT_KEYWORDS.items()
+    for keyword, weight in keywords
+}
+
+def _alternation(keywords):
+    """Alternativa regex factorizada por prefijos: "hora(?:rio)?" en lugar de "horario|hora"
+
+    El opcional es voraz, así que en cada posición gana la raíz más larga.
+    """
+    tree = {}
+    for keyword in keywords:
+        node = tree
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
 
-    if "horario" in msg or "hora" in msg or "abierto" in msg:
-        return "horario"
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
 
-    if "requisito" in msg or "documento" in msg or "necesito" in msg:
-        return "requisitos"
+    return emit(tree)
 
-    if "información" in msg or "informacion" in msg or "ayuda" in msg:
-        return "informacion"
+# Una sola pasada por mensaje con todas las raíces
+_MATCHER = re.compile(r"\b" + _alternation(_WEIGHTS))
 
-    if "solicitud" in msg or "tramite" in msg or "trámite" in msg or "constancia" in msg:
-        return "registrar_solicitud"
+def score_intents(message: str):
+    """Devuelve [(intención, puntaje)] de mayor a menor"""
+    scores = {}
+    for keyword in _MATCHER.findall(fold_accents(message.lower())):
+        intent, weight = _WEIGHTS[keyword]
+        scores[intent] = scores.get(intent, 0) + weight
+    if len(scores) < 2:
+        return list(scores.items())
+    return sorted(scores.items(), key=lambda item: (-item[1], _INTENT_PRIORITY[item[0]]))
+
+def classify_intent(message: str):
+    scored = score_intents(message)
+    return scored[0][0] if scored else "otro"
 
-    return "otro"
\ No newline at end of file
+def classify_intents(messages):
+    """Clasificación por lotes de una lista de mensajes"""
+    return [classify_intent(message) for message in messages]
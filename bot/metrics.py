@@ -0,0 +1,301 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Endpoint Prometheus (0 = desactivado) y volcado periódico opcional a archivo
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_DUMP_PATH = os.getenv("METRICS_DUMP_PATH", "")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+
+# Segundos; cubre desde una clasificación de intención hasta una llamada lenta a OpenAI
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Histograma de buckets fijos: observe() es un bisect y una suma bajo lock"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # [conteo por bucket..., +Inf, suma]
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        bounds = self.buckets + (float("inf"),)
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]!r}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+REGISTRY = []
+# Funciones que devuelven {nombre: valor} con los contadores que ya llevan
+# otros módulos (pool de MySQL, cliente de OpenAI, sesiones, etc.). Corren en
+# el hilo del exportador: deben devolver una copia tomada bajo su propio lock.
+_collectors = {}
+_collectors_lock = threading.Lock()
+
+def register_collector(prefix, stats_fn):
+    """
+    Expone en cada scrape los números de `stats_fn()` como `<prefix>_<clave>`.
+    Registrar otra vez el mismo prefijo reemplaza la función anterior.
+    """
+    with _collectors_lock:
+        _collectors[prefix] = stats_fn
+
+def _flatten(prefix, stats, out):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            _flatten(name, value, out)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out.append((name, value))
+
+def render():
+    """Todas las métricas en formato de texto de Prometheus"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    with _collectors_lock:
+        collectors = list(_collectors.items())
+    for prefix, stats_fn in collectors:
+        samples = []
+        try:
+            _flatten(prefix, stats_fn(), samples)
+        except Exception as e:
+            print(f"Error métricas ({prefix}): {e}")
+            continue
+        for name, value in samples:
+            lines.append(f"# TYPE {name} untyped")
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------------
+# MÉTRICAS DEL BOT
+# -------------------------------------------------------
+HANDLER_SECONDS = Histogram("csdc_handler_seconds", "Duración de cada handler de Telegram", ["handler"])
+HANDLER_IN_FLIGHT = Gauge("csdc_handler_in_flight", "Handlers ejecutándose ahora", ["handler"])
+HANDLER_ERRORS = Counter("csdc_handler_errors_total", "Excepciones no controladas por handler", ["handler"])
+
+CLASSIFY_SECONDS = Histogram("csdc_classify_intent_seconds", "Duración de classify_intent")
+ROUTE_SECONDS = Histogram(
+    "csdc_message_route_seconds",
+    "Duración de process_message según a dónde se enrutó el mensaje (intención, FAQ, flujo, IA)",
+    ["route"]
+)
+FLOW_STEP_SECONDS = Histogram("csdc_flow_step_seconds", "Duración de cada paso del flujo de solicitud", ["step"])
+
+EXTERNAL_SECONDS = Histogram(
+    "csdc_external_seconds", "Duración de llamadas externas", ["service", "operation"]
+)
+EXTERNAL_IN_FLIGHT = Gauge("csdc_external_in_flight", "Llamadas externas en curso", ["service"])
+EXTERNAL_ERRORS = Counter("csdc_external_errors_total", "Llamadas externas fallidas", ["service", "operation"])
+
+
+class track_external:
+    """
+    Mide una llamada externa (`with track_external("mysql", "insert_request"):`):
+    duración, llamadas en curso y errores. Sirve igual en código síncrono y async.
+    """
+    __slots__ = ("service", "operation", "started")
+
+    def __init__(self, service, operation):
+        self.service = service
+        self.operation = operation
+
+    def __enter__(self):
+        EXTERNAL_IN_FLIGHT.inc(self.service)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        EXTERNAL_SECONDS.observe(time.perf_counter() - self.started, self.service, self.operation)
+        EXTERNAL_IN_FLIGHT.dec(self.service)
+        if exc_type is not None:
+            EXTERNAL_ERRORS.inc(self.service, self.operation)
+        return False
+
+def instrument_handler(name):
+    """Decorador para handlers async de python-telegram-bot"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(update, context):
+            HANDLER_IN_FLIGHT.inc(name)
+            started = time.perf_counter()
+            try:
+                return await handler(update, context)
+            except Exception:
+                HANDLER_ERRORS.inc(name)
+                raise
+            finally:
+                HANDLER_SECONDS.observe(time.perf_counter() - started, name)
+                HANDLER_IN_FLIGHT.dec(name)
+        return wrapper
+    return decorator
+
+
+# -------------------------------------------------------
+# EXPOSICIÓN: HTTP Y VOLCADO A ARCHIVO
+# -------------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _dump_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(render())
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error métricas: no se pudo escribir {path}: {e}")
+
+_started = False
+
+def configure_worker(index):
+    """En modo webhook cada proceso worker usa su propio puerto y archivo"""
+    global METRICS_PORT, METRICS_DUMP_PATH
+    if METRICS_PORT:
+        METRICS_PORT += index
+    if METRICS_DUMP_PATH:
+        root, ext = os.path.splitext(METRICS_DUMP_PATH)
+        METRICS_DUMP_PATH = f"{root}.{index}{ext}"
+
+def start():
+    """Levanta el endpoint /metrics y el volcado periódico según la configuración"""
+    global _started
+    if _started:
+        return
+    _started = True
+    if METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), _MetricsHandler)
+        except OSError as e:
+            print(f"Error métricas: no se pudo abrir {METRICS_HOST}:{METRICS_PORT}: {e}")
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="csdc-metrics", daemon=True).start()
+            print(f"📈 Métricas en http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    if METRICS_DUMP_PATH:
+        threading.Thread(
+            target=_dump_loop, args=(METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL),
+            name="csdc-metrics-dump", daemon=True
+        ).start()
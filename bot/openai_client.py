@@ -1,31 +1,286 @@
-from openai import OpenAI
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI, AsyncOpenAI, APITimeoutError
 import os
 from dotenv import load_dotenv
+from bot.response_cache import ResponseCache
+from bot.circuit_breaker import CircuitBreaker
+from bot.metrics import register_collector, track_external
 
 load_dotenv()
 
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Límite global de llamadas simultáneas, cola de espera y timeout por llamada
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_MAX_QUEUE = int(os.getenv("OPENAI_MAX_QUEUE", "32"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "20"))
+# Plazo por mensaje (cola + llamada, o hasta el primer fragmento en streaming);
+# vencido, el usuario recibe la respuesta local en vez de seguir esperando
+OPENAI_DEADLINE = float(os.getenv("OPENAI_DEADLINE", "10"))
+# Disyuntor: ventana de observación, mínimo de llamadas para decidir,
+# fracción de errores o de llamadas lentas que lo abren, tiempo abierto
+# y llamadas de prueba en semiabierto
+OPENAI_BREAKER_WINDOW = float(os.getenv("OPENAI_BREAKER_WINDOW", "30"))
+OPENAI_BREAKER_MIN_CALLS = int(os.getenv("OPENAI_BREAKER_MIN_CALLS", "10"))
+OPENAI_BREAKER_ERROR_RATE = float(os.getenv("OPENAI_BREAKER_ERROR_RATE", "0.5"))
+OPENAI_BREAKER_SLOW_SECONDS = float(os.getenv("OPENAI_BREAKER_SLOW_SECONDS", "6"))
+OPENAI_BREAKER_SLOW_RATE = float(os.getenv("OPENAI_BREAKER_SLOW_RATE", "0.8"))
+OPENAI_BREAKER_OPEN_SECONDS = float(os.getenv("OPENAI_BREAKER_OPEN_SECONDS", "30"))
+OPENAI_BREAKER_PROBES = int(os.getenv("OPENAI_BREAKER_PROBES", "1"))
+# Reintentos cuando la cola está llena (espera lineal entre intentos)
+OPENAI_BUSY_RETRIES = int(os.getenv("OPENAI_BUSY_RETRIES", "2"))
+OPENAI_BUSY_RETRY_DELAY = float(os.getenv("OPENAI_BUSY_RETRY_DELAY", "2"))
+# Mostrar la respuesta de la IA a medida que se genera (1) o completa al final (0)
+OPENAI_STREAM = os.getenv("OPENAI_STREAM", "1") == "1"
+# Caché de respuestas (AI_CACHE_PATH vacío = solo memoria)
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "1000"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "86400"))
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "")
+
+SYSTEM_PROMPT = (
+    "Eres el Asistente Virtual del Centro de Servicios Digitales (CSDC). "
+    "Tu objetivo es ayudar con trámites administrativos de forma clara y útil. "
+    "INSTRUCCIÓN DE IDIOMA: Detecta automáticamente el idioma del usuario. "
+    "Si el usuario escribe en inglés, RESPONDE EN INGLÉS. "
+    "Si el usuario escribe en español, responde en español. "
+    "Usa formato Markdown (negritas, listas) para facilitar la lectura."
+)
+
+ERROR_MESSAGE = "Lo siento, tuve un problema técnico. / I'm sorry, I had a technical issue."
+BUSY_RETRY_MESSAGE = "⏳ Estoy atendiendo muchas consultas, reintento en un momento... / Busy, retrying..."
+BUSY_MESSAGE = (
+    "⚠️ Ahora mismo hay mucha demanda. Intenta de nuevo en unos minutos. / "
+    "We're very busy right now, please try again in a few minutes."
+)
+
+# Respuesta especial cuando la cola de IA está llena (backpressure)
+AI_BUSY = "__AI_BUSY__"
+# Respuesta especial cuando la IA no está disponible (circuito abierto, error o plazo vencido)
+AI_UNAVAILABLE = "__AI_UNAVAILABLE__"
+
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    timeout=OPENAI_TIMEOUT,
+    max_retries=0
+)
+
+response_cache = ResponseCache(
+    max_entries=AI_CACHE_SIZE,
+    ttl_seconds=AI_CACHE_TTL,
+    path=AI_CACHE_PATH or None
+)
+# Un solo hilo para la caché en SQLite: sus consultas y commits no bloquean el loop
+_cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-cache")
+
+openai_breaker = CircuitBreaker(
+    window_seconds=OPENAI_BREAKER_WINDOW,
+    min_calls=OPENAI_BREAKER_MIN_CALLS,
+    error_rate=OPENAI_BREAKER_ERROR_RATE,
+    slow_call_seconds=OPENAI_BREAKER_SLOW_SECONDS,
+    slow_call_rate=OPENAI_BREAKER_SLOW_RATE,
+    open_seconds=OPENAI_BREAKER_OPEN_SECONDS,
+    half_open_probes=OPENAI_BREAKER_PROBES,
+    # Lo más que puede durar una llamada legítima
+    probe_timeout=OPENAI_DEADLINE + OPENAI_TIMEOUT
+)
+
+_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+_openai_stats = {
+    "in_flight": 0,
+    "waiting": 0,
+    "rejected": 0,
+    "queue_timeouts": 0,
+    "timeouts": 0,
+    "errors": 0,
+}
+
+def _build_messages(message):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": message}
+    ]
 
 def ask_openai(message):
+    cached = response_cache.get(message)
+    if cached is not None:
+        return cached
+    if not openai_breaker.allow():
+        return ERROR_MESSAGE
+
+    started = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": (
-                        "Eres el Asistente Virtual del Centro de Servicios Digitales (CSDC). "
-                        "Tu objetivo es ayudar con trámites administrativos de forma clara y útil. "
-                        "INSTRUCCIÓN DE IDIOMA: Detecta automáticamente el idioma del usuario. "
-                        "Si el usuario escribe en inglés, RESPONDE EN INGLÉS. "
-                        "Si el usuario escribe en español, responde en español. "
-                        "Usa formato Markdown (negritas, listas) para facilitar la lectura."
+        with track_external("openai", "chat_completion"):
+            response = client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=_build_messages(message),
+                timeout=OPENAI_DEADLINE
+            )
+        answer = response.choices[0].message.content
+    except Exception as e:
+        openai_breaker.record(False, time.perf_counter() - started)
+        print(f"Error OpenAI: {e}")
+        return ERROR_MESSAGE
+    openai_breaker.record(True, time.perf_counter() - started)
+    _cache_answer(message, answer)
+    return answer
+
+async def _acquire_slot():
+    """Espera turno para llamar a OpenAI; False si la cola ya está llena"""
+    if _semaphore.locked() and _openai_stats["waiting"] >= OPENAI_MAX_QUEUE:
+        _openai_stats["rejected"] += 1
+        return False
+
+    _openai_stats["waiting"] += 1
+    try:
+        await _semaphore.acquire()
+    finally:
+        _openai_stats["waiting"] -= 1
+    _openai_stats["in_flight"] += 1
+    return True
+
+def _release_slot():
+    _openai_stats["in_flight"] -= 1
+    _semaphore.release()
+
+def _cache_answer(message, answer):
+    # La caché es opcional: si falla (p. ej. SQLite bloqueado) la respuesta igual se entrega
+    try:
+        response_cache.set(message, answer)
+    except Exception as e:
+        print(f"Error caché IA: {e}")
+
+async def _cached_answer(message):
+    if not response_cache.persistent:
+        return response_cache.get(message)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_cache_executor, response_cache.get, message)
+    except Exception as e:
+        print(f"Error caché IA: {e}")
+        return None
+
+def _store_answer(message, answer):
+    if not response_cache.persistent:
+        _cache_answer(message, answer)
+        return
+    # El commit en SQLite queda en segundo plano; la respuesta no lo espera
+    asyncio.get_running_loop().run_in_executor(_cache_executor, _cache_answer, message, answer)
+
+async def _ask(message, on_text=None):
+    # Las preguntas repetidas se responden desde la caché sin ocupar cupo
+    cached = await _cached_answer(message)
+    if cached is not None:
+        return cached
+
+    # Circuito abierto: ni se encola ni se llama; el bot responde en modo degradado
+    if not openai_breaker.allow():
+        return AI_UNAVAILABLE
+
+    # (ok, segundos) para el disyuntor; None si la llamada no llegó a hacerse
+    # o se canceló, y entonces solo se libera el permiso
+    outcome = None
+    try:
+        answer, outcome = await _call_openai(message, on_text)
+    finally:
+        if outcome is None:
+            openai_breaker.release()
+        else:
+            openai_breaker.record(*outcome)
+
+    if answer not in (AI_BUSY, AI_UNAVAILABLE):
+        _store_answer(message, answer)
+    return answer
+
+async def _call_openai(message, on_text):
+    """(respuesta, resultado para el disyuntor o None si no se llamó a OpenAI)"""
+    # El plazo cuenta desde que llega el mensaje: incluye la espera en la cola
+    received = asyncio.get_running_loop().time()
+    deadline = received + OPENAI_DEADLINE
+    try:
+        async with asyncio.timeout_at(deadline):
+            admitted = await _acquire_slot()
+    except TimeoutError:
+        _openai_stats["queue_timeouts"] += 1
+        return AI_UNAVAILABLE, None
+    if not admitted:
+        return AI_BUSY, None
+
+    started = time.perf_counter()
+    # Latencia que juzga el disyuntor: respuesta completa, o primer fragmento en streaming
+    latency = None
+    try:
+        if on_text is None:
+            with track_external("openai", "chat_completion"):
+                async with asyncio.timeout_at(deadline):
+                    response = await async_client.chat.completions.create(
+                        model=OPENAI_MODEL,
+                        messages=_build_messages(message)
                     )
-                },
-                {"role": "user", "content": message}
-            ]
-        )
-        return response.choices[0].message.content
+            answer = response.choices[0].message.content
+        else:
+            answer = ""
+            with track_external("openai", "chat_completion_stream"):
+                async with asyncio.timeout_at(deadline) as timeout:
+                    stream = await async_client.chat.completions.create(
+                        model=OPENAI_MODEL,
+                        messages=_build_messages(message),
+                        stream=True
+                    )
+                    async with stream:
+                        async for chunk in stream:
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if not delta:
+                                continue
+                            if latency is None:
+                                # Ya hay texto a la vista: el resto tiene hasta OPENAI_TIMEOUT
+                                latency = time.perf_counter() - started
+                                timeout.reschedule(received + max(OPENAI_DEADLINE, OPENAI_TIMEOUT))
+                            answer += delta
+                            on_text(answer)
+        if not answer:
+            raise ValueError("respuesta vacía")
+    except (TimeoutError, APITimeoutError):
+        _openai_stats["timeouts"] += 1
+        print(f"Error OpenAI: sin respuesta dentro del plazo de {OPENAI_DEADLINE}s")
+        return AI_UNAVAILABLE, (False, time.perf_counter() - started)
     except Exception as e:
+        _openai_stats["errors"] += 1
         print(f"Error OpenAI: {e}")
-        return "Lo siento, tuve un problema técnico. / I'm sorry, I had a technical issue."
\ No newline at end of file
+        return AI_UNAVAILABLE, (False, time.perf_counter() - started)
+    finally:
+        _release_slot()
+    return answer, (True, latency if latency is not None else time.perf_counter() - started)
+
+async def ask_openai_async(message):
+    """
+    Versión asíncrona de ask_openai para el event loop del bot.
+    Devuelve AI_BUSY si ya hay OPENAI_MAX_QUEUE mensajes esperando turno, y
+    AI_UNAVAILABLE si el circuito está abierto, la llamada falla o no hay
+    respuesta dentro de OPENAI_DEADLINE.
+    """
+    return await _ask(message)
+
+async def ask_openai_stream(message, on_text):
+    """
+    Igual que ask_openai_async, pero pide la respuesta en streaming y llama
+    `on_text(texto_acumulado)` con cada fragmento que llega. on_text no debe
+    bloquear: solo anota el texto (ver StreamingReply).
+
+    OPENAI_DEADLINE aplica hasta el primer fragmento; desde ahí la respuesta
+    completa tiene hasta OPENAI_TIMEOUT. Si estaba en caché se devuelve sin
+    llamar a on_text.
+    """
+    return await _ask(message, on_text)
+
+def get_openai_stats():
+    """Copia de los contadores del cliente asíncrono y de la caché"""
+    stats = dict(_openai_stats)
+    stats["cache"] = response_cache.get_stats()
+    return stats
+
+register_collector("csdc_openai", get_openai_stats)
+register_collector("csdc_openai_breaker", openai_breaker.get_stats)
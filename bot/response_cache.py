@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from bot.text_utils import normalize_message
+
+# Palabras frecuentes para etiquetar el idioma de la pregunta (la IA responde
+# en el idioma del usuario, así que la misma pregunta en otro idioma es otra entrada)
+_EN_WORDS = {
+    "the", "is", "are", "where", "what", "how", "when", "do", "does", "can",
+    "i", "you", "my", "office", "hours", "open", "need", "please", "long"
+}
+_ES_WORDS = {
+    "el", "la", "los", "las", "es", "donde", "que", "como", "cuando", "puedo",
+    "yo", "mi", "oficina", "horario", "necesito", "cuanto", "de", "por", "para"
+}
+
+def detect_language(normalized):
+    words = normalized.split()
+    en = sum(1 for w in words if w in _EN_WORDS)
+    es = sum(1 for w in words if w in _ES_WORDS)
+    return "en" if en > es else "es"
+
+# Mínimo de letras o dígitos para cachear: "👍", "???" o "¿¿??" quedan vacíos al
+# normalizar y compartirían una misma entrada con respuestas que no se relacionan
+CACHE_MIN_CHARS = 3
+
+def cache_key(message):
+    """Clave de caché del mensaje, o None si es muy corto para identificar una pregunta"""
+    normalized = normalize_message(message)
+    if sum(c.isalnum() for c in normalized) < CACHE_MIN_CHARS:
+        return None
+    return f"{detect_language(normalized)}:{normalized}"
+
+
+class ResponseCache:
+    """
+    Caché LRU con TTL para respuestas de la IA.
+    Si se indica `path`, las entradas también se guardan en SQLite y
+    sobreviven a reinicios del bot.
+    """
+
+    def __init__(self, max_entries=1000, ttl_seconds=86400, path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "skipped": 0}
+
+        # Con SQLite, get/set hacen I/O y commits: no llamarlos desde el event loop
+        self.persistent = bool(path)
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self.purge_expired()
+
+    def _is_fresh(self, created_at):
+        return time.time() - created_at < self.ttl_seconds
+
+    def _load_from_disk(self, key):
+        row = self._db.execute(
+            "SELECT response, created_at FROM ai_cache WHERE key = ?", (key,)
+        ).fetchone()
+        return row
+
+    def get(self, message):
+        key = cache_key(message)
+        if key is None:
+            with self._lock:
+                self.stats["skipped"] += 1
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._load_from_disk(key)
+
+            if entry is not None and not self._is_fresh(entry[1]):
+                self.stats["expired"] += 1
+                self._delete(key)
+                entry = None
+
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def set(self, message, response):
+        key = cache_key(message)
+        if key is None:
+            return
+        entry = (response, time.time())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO ai_cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, entry[0], entry[1])
+                )
+                self._db.commit()
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _evict(self):
+        # Solo la memoria es LRU; en disco se purgan las entradas vencidas
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def purge_expired(self):
+        """Elimina entradas vencidas en memoria y en disco"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            stale = [k for k, (_, created) in self._entries.items() if created <= cutoff]
+            for key in stale:
+                del self._entries[key]
+            self.stats["expired"] += len(stale)
+            if self._db is not None:
+                self._db.execute("DELETE FROM ai_cache WHERE created_at <= ?", (cutoff,))
+                self._db.commit()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
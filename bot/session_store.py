@@ -0,0 +1,242 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, astuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.sqlite3")
+# Cada cuántos milisegundos se escriben en SQLite los cambios de sesión
+SESSION_FLUSH_MS = float(os.getenv("SESSION_FLUSH_MS", "200"))
+# Cada cuántos guardados se barren las sesiones vencidas
+PURGE_EVERY = 256
+
+
+@dataclass(slots=True)
+class Session:
+    """Estado de un usuario dentro del flujo de solicitud"""
+    step: int = 1
+    nombre: str = ""
+    correo: str = ""
+    tipo_solicitud: str = ""
+    detalle: str = ""
+    updated_at: float = 0.0
+
+    def data(self):
+        """Datos capturados, en el formato de la ficha resumen"""
+        return {
+            "nombre": self.nombre,
+            "correo": self.correo,
+            "tipo_solicitud": self.tipo_solicitud,
+            "detalle": self.detalle
+        }
+
+
+class MemorySessionStore:
+    """
+    Sesiones en memoria con expiración (TTL) y tope de entradas (LRU).
+    Los usuarios que abandonan el flujo se liberan solos.
+    """
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES, ttl_seconds=SESSION_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._saves = 0
+        self.stats = {"expired": 0, "evicted": 0}
+
+    def _expired(self, session):
+        return time.time() - session.updated_at >= self.ttl_seconds
+
+    def _load(self, user_id):
+        return None
+
+    def get(self, user_id):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = self._load(user_id)
+                if session is None:
+                    return None
+                self._sessions[user_id] = session
+            if self._expired(session):
+                self.stats["expired"] += 1
+                self.delete(user_id)
+                return None
+            self._sessions.move_to_end(user_id)
+            self._evict()
+            return session
+
+    def save(self, user_id, session):
+        """Guarda la sesión y renueva su TTL (llamar después de cada cambio)"""
+        session.updated_at = time.time()
+        with self._lock:
+            self._sessions[user_id] = session
+            self._sessions.move_to_end(user_id)
+            self._evict()
+            self._saves += 1
+            if self._saves % PURGE_EVERY == 0:
+                self.purge_expired()
+
+    def delete(self, user_id):
+        with self._lock:
+            return self._sessions.pop(user_id, None) is not None
+
+    def pop(self, user_id):
+        with self._lock:
+            session = self.get(user_id)
+            if session is not None:
+                self.delete(user_id)
+            return session
+
+    def _evict(self):
+        while len(self._sessions) > self.max_entries:
+            self.delete(next(iter(self._sessions)))
+            self.stats["evicted"] += 1
+
+    def purge_expired(self):
+        with self._lock:
+            stale = [uid for uid, s in self._sessions.items() if self._expired(s)]
+            for user_id in stale:
+                self.delete(user_id)
+            self.stats["expired"] += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {"active": len(self._sessions), **self.stats}
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(MemorySessionStore):
+    """
+    Igual que MemorySessionStore pero con copia en SQLite: las solicitudes a
+    medio llenar sobreviven a un reinicio del bot.
+
+    La memoria es la fuente de verdad: las sesiones vigentes se cargan al
+    crear el store y get()/`in` nunca consultan la base. Los cambios se anotan
+    y un hilo de fondo los escribe cada `flush_interval` segundos en una sola
+    transacción, así el event loop no espera a SQLite. Una caída del proceso
+    puede perder los cambios del último intervalo.
+    """
+
+    def __init__(self, path=SESSION_DB_PATH, flush_interval=SESSION_FLUSH_MS / 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "user_id INTEGER PRIMARY KEY, step INTEGER, nombre TEXT, correo TEXT, "
+            "tipo_solicitud TEXT, detalle TEXT, updated_at REAL)"
+        )
+        self._db.commit()
+        self._load_all()
+
+        # user_id -> fila a guardar, o None para borrarla
+        self._dirty = {}
+        self._clear_pending = False
+        # Un solo envío a la vez (hilo de fondo, flush() o close())
+        self._write_lock = threading.Lock()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="csdc-sessions", daemon=True)
+        self._thread.start()
+
+    def _load_all(self):
+        """Carga las sesiones vigentes (las más recientes, hasta max_entries)"""
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM sessions WHERE updated_at <= ?", (cutoff,))
+        rows = self._db.execute(
+            "SELECT user_id, step, nombre, correo, tipo_solicitud, detalle, updated_at "
+            "FROM sessions ORDER BY updated_at DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        self._db.commit()
+        for user_id, *fields in reversed(rows):
+            self._sessions[user_id] = Session(*fields)
+
+    def save(self, user_id, session):
+        with self._lock:
+            super().save(user_id, session)
+            self._dirty[user_id] = astuple(session)
+
+    def delete(self, user_id):
+        with self._lock:
+            # Aunque no esté en memoria: puede quedar una fila que no se cargó
+            self._dirty[user_id] = None
+            return super().delete(user_id)
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._dirty = {}
+            self._clear_pending = True
+
+    def _run(self):
+        while not self._closing.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Escribe en SQLite los cambios pendientes; False si falló (se reintentan después)"""
+        with self._write_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                clear, self._clear_pending = self._clear_pending, False
+            if not dirty and not clear:
+                return True
+            try:
+                with self._db:
+                    if clear:
+                        self._db.execute("DELETE FROM sessions")
+                    self._db.executemany(
+                        "DELETE FROM sessions WHERE user_id = ?",
+                        [(user_id,) for user_id, row in dirty.items() if row is None]
+                    )
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(user_id, *row) for user_id, row in dirty.items() if row is not None]
+                    )
+                return True
+            except sqlite3.Error as e:
+                print(f"Error sesiones SQLite: {e}")
+                with self._lock:
+                    # Lo que cambió mientras tanto es más nuevo y se queda
+                    for user_id, row in dirty.items():
+                        self._dirty.setdefault(user_id, row)
+                    self._clear_pending = self._clear_pending or clear
+                return False
+
+    def close(self):
+        """Detiene el hilo de fondo y escribe lo pendiente"""
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        self._thread.join()
+        self.flush()
+        self._db.close()
+
+
+def create_session_store():
+    """Store según SESSION_BACKEND ("memory" o "sqlite")"""
+    if SESSION_BACKEND == "sqlite":
+        store = SQLiteSessionStore()
+        atexit.register(store.close)
+        return store
+    return MemorySessionStore()
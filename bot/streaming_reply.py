@@ -0,0 +1,195 @@
+import asyncio
+import os
+import re
+from dotenv import load_dotenv
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+load_dotenv()
+
+# Telegram tolera ~1 edición por segundo en un mismo chat antes de responder 429
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+# Largo máximo de un mensaje de Telegram
+MAX_MESSAGE_LENGTH = 4096
+# Margen para los marcadores que close_markdown agrega a un texto parcial
+PREVIEW_LENGTH = MAX_MESSAGE_LENGTH - 16
+
+# Un enlace [texto](url) que todavía no termina de llegar, al final del texto
+_PENDING_LINK = re.compile(r"\[[^\]]*(\](\([^)]*)?)?$")
+_LINK = re.compile(r"\[[^\]]*\]\([^)]*\)")
+
+
+def close_markdown(text):
+    """
+    Vuelve seguro para parse_mode="Markdown" un texto a medio generar: cierra
+    la entidad que quedó abierta (*negrita*, _cursiva_, `código`, ```bloque```)
+    y corta un [enlace](url) incompleto. En el Markdown de Telegram las
+    entidades no se anidan, así que basta con seguir una a la vez.
+    """
+    open_marker = None
+    open_at = 0
+    i = 0
+    while i < len(text):
+        if open_marker in ("`", "```"):
+            # Dentro de código todo es literal hasta el cierre
+            if text.startswith(open_marker, i):
+                i += len(open_marker)
+                open_marker = None
+            else:
+                i += 1
+            continue
+        ch = text[i]
+        if ch == "\\":
+            if i + 1 == len(text):
+                text = text[:i]
+                break
+            i += 2
+            continue
+        if open_marker is None and text.startswith("```", i):
+            open_marker, open_at = "```", i
+            i += 3
+            continue
+        if ch in "*_`":
+            if open_marker == ch:
+                open_marker = None
+            elif open_marker is None:
+                open_marker, open_at = ch, i
+            i += 1
+            continue
+        if ch == "[" and open_marker is None:
+            link = _LINK.match(text, i)
+            if link:
+                i = link.end()
+                continue
+            if _PENDING_LINK.match(text, i):
+                text = text[:i]
+                break
+        i += 1
+
+    if open_marker is None:
+        return text
+    if open_at + len(open_marker) >= len(text.rstrip()):
+        # El marcador acaba de abrir y no tiene contenido: se oculta por ahora
+        return text[:open_at]
+    return text + open_marker
+
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Parte un texto largo en mensajes, de preferencia en saltos de línea"""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    parts.append(text)
+    return parts
+
+
+class StreamingReply:
+    """
+    Respuesta de la IA que se muestra mientras se genera, en un solo mensaje.
+
+    feed() solo anota el texto acumulado (se llama por cada fragmento del
+    stream y nunca espera). Una tarea aparte envía el primer fragmento de
+    inmediato y luego edita el mensaje como máximo cada STREAM_EDIT_INTERVAL
+    segundos; los textos parciales pasan por close_markdown. finish() espera a
+    esa tarea y deja la respuesta final con Markdown, o en texto plano si
+    Telegram no logra interpretarlo.
+    """
+
+    def __init__(self, source_message, edit_interval=STREAM_EDIT_INTERVAL):
+        self.source_message = source_message
+        self.edit_interval = edit_interval
+        self.message = None
+        self._text = ""
+        self._shown = None
+        self._changed = asyncio.Event()
+        self._done = asyncio.Event()
+        self._task = None
+
+    def feed(self, text):
+        self._text = text
+        self._changed.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            if self._done.is_set():
+                return
+            self._changed.clear()
+            preview = close_markdown(self._text[:PREVIEW_LENGTH])
+            if preview.strip():
+                try:
+                    await self._show(preview, parse_mode="Markdown")
+                except BadRequest:
+                    # Markdown que Telegram no acepta: el parcial va en texto plano
+                    await self._try_show(self._text[:MAX_MESSAGE_LENGTH], parse_mode=None)
+                except RetryAfter as e:
+                    await self._wait(e.retry_after)
+                except TelegramError as e:
+                    print(f"Error al mostrar respuesta parcial: {e}")
+            await self._wait(self.edit_interval)
+
+    async def _wait(self, seconds):
+        # Pausa entre ediciones que termina antes si llega finish()
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _show(self, text, parse_mode, reply_markup=None):
+        if self._shown == (text, parse_mode) and reply_markup is None:
+            return
+        if self.message is None:
+            self.message = await self.source_message.reply_text(
+                text, parse_mode=parse_mode, reply_markup=reply_markup
+            )
+        else:
+            await self.message.edit_text(text, parse_mode=parse_mode, reply_markup=reply_markup)
+        self._shown = (text, parse_mode)
+
+    async def _try_show(self, text, parse_mode):
+        try:
+            await self._show(text, parse_mode)
+        except TelegramError as e:
+            # "message is not modified" y similares: el mensaje ya muestra algo válido
+            print(f"Error al mostrar respuesta parcial: {e}")
+
+    async def finish(self, text, reply_markup=None):
+        """
+        Deja `text` como respuesta final (edita el mensaje o lo envía si aún no
+        existe). `reply_markup` debe ser un teclado inline para poder editarlo.
+        """
+        if self._task is not None:
+            self._done.set()
+            self._changed.set()
+            await self._task
+
+        *parts, last = split_message(text)
+        # Con varias partes, el teclado va en la última
+        first = parts[0] if parts else last
+        first_markup = None if parts else reply_markup
+        try:
+            await self._show_final(first, first_markup)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            await self._show_final(first, first_markup)
+        if parts:
+            for part in parts[1:]:
+                await self._reply_markdown(part)
+            await self._reply_markdown(last, reply_markup)
+
+    async def _show_final(self, text, reply_markup=None):
+        try:
+            await self._show(text, "Markdown", reply_markup)
+        except BadRequest:
+            await self._show(text, None, reply_markup)
+
+    async def _reply_markdown(self, text, reply_markup=None):
+        try:
+            await self.source_message.reply_text(text, parse_mode="Markdown", reply_markup=reply_markup)
+        except BadRequest:
+            await self.source_message.reply_text(text, reply_markup=reply_markup)
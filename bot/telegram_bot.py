@@ -1,6 +1,8 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.request import BaseRequest, HTTPXRequest
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -16,9 +18,26 @@ from bot.handlers import (
     cancel_request_flow, 
     revert_step, 
     get_summary,
-    confirm_and_save
+    set_request_type,
+    confirm_and_save,
+    local_fallback_answer
+)
+from bot.update_processor import PerUserUpdateProcessor
+from bot import metrics
+from bot.metrics import instrument_handler, track_external
+from bot.conversation_logger import conversation_logger, log_conversation
+from bot.streaming_reply import StreamingReply
+from bot.openai_client import (
+    ask_openai_async,
+    ask_openai_stream,
+    AI_BUSY,
+    AI_UNAVAILABLE,
+    BUSY_MESSAGE,
+    BUSY_RETRY_MESSAGE,
+    OPENAI_BUSY_RETRIES,
+    OPENAI_BUSY_RETRY_DELAY,
+    OPENAI_STREAM
 )
-from bot.openai_client import ask_openai
 
 load_dotenv()
 
@@ -63,6 +82,7 @@ def confirm_menu():
 # -------------------------------------------------------
 # START
 # -------------------------------------------------------
+@instrument_handler("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data["has_started"] = True
     # Si había un estado anterior colgado, lo limpiamos
@@ -79,6 +99,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # -------------------------------------------------------
 # MANEJO DE BOTONES (CALLBACKS)
 # -------------------------------------------------------
+@instrument_handler("button_handler")
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -96,11 +117,11 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # 2. Confirmar y Guardar (Paso final)
     if data == "flow_confirm":
-        success = confirm_and_save(user_id)
+        success = await confirm_and_save(user_id)
         if success:
             await query.message.edit_text(
                 "✅ *¡Solicitud Enviada con Éxito!*\n\n"
-                "Hemos recibido tu información. Recibirás una notificación en tu correo institucional pronto.",
+                "Hemos recibido tu información. Te avisaremos por este chat cuando haya novedades.",
                 parse_mode="Markdown"
             )
             await query.message.reply_text("¿Deseas realizar otra gestión?", reply_markup=main_menu())
@@ -144,11 +165,8 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # --- SELECCIÓN TIPO SOLICITUD (Paso 3) ---
     elif data.startswith("tipo_"):
-        if user_id in user_states:
-            tipo = data.replace("tipo_", "").capitalize()
-            user_states[user_id]["data"]["tipo_solicitud"] = tipo
-            user_states[user_id]["step"] = 4
-            
+        tipo = data.replace("tipo_", "").capitalize()
+        if set_request_type(user_id, tipo):
             await query.message.edit_text(f"📌 *Tipo seleccionado:* {tipo}", parse_mode="Markdown")
             await query.message.reply_text(
                 "✍️ Por último, describe **brevemente** tu solicitud:\n_(Ej: Necesito constancia de notas ciclo I-2024)_",
@@ -161,6 +179,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # -------------------------------------------------------
 # MANEJO DE MENSAJES DE TEXTO
 # -------------------------------------------------------
+async def ask_ai(text, reply):
+    if OPENAI_STREAM:
+        return await ask_openai_stream(text, reply.feed)
+    return await ask_openai_async(text)
+
+@instrument_handler("handle_message")
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     text = update.message.text.strip()
@@ -219,25 +243,104 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # D) Fallback IA
     if response == "__AI_FALLBACK__":
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
-        ai_response = ask_openai(text)
-        await update.message.reply_text(ai_response, parse_mode="Markdown")
+        # Con streaming, la respuesta aparece en un mensaje que se va editando
+        reply = StreamingReply(update.message)
+        ai_response = await ask_ai(text, reply)
+
+        # Cola de IA llena: avisamos y reintentamos en lugar de acumular esperas
+        attempt = 0
+        while ai_response == AI_BUSY and attempt < OPENAI_BUSY_RETRIES:
+            if attempt == 0:
+                await update.message.reply_text(BUSY_RETRY_MESSAGE)
+            attempt += 1
+            await asyncio.sleep(OPENAI_BUSY_RETRY_DELAY * attempt)
+            ai_response = await ask_ai(text, reply)
+
+        if ai_response == AI_UNAVAILABLE:
+            # Modo degradado: respuesta local inmediata y el menú para seguir
+            ai_response = local_fallback_answer(text)
+            await reply.finish(ai_response, reply_markup=main_menu())
+            log_conversation(user_id, text, ai_response)
+            return
+
+        if ai_response == AI_BUSY:
+            ai_response = BUSY_MESSAGE
+        await reply.finish(ai_response)
+        log_conversation(user_id, text, ai_response)
         return
 
     # E) Respuesta normal del flujo (preguntas de nombre/correo)
     # Agregamos botones de navegación si estamos dentro del flujo
-    markup = nav_keyboard() if user_id in user_states else None
+    in_flow = user_id in user_states
+    markup = nav_keyboard() if in_flow else None
     await update.message.reply_text(response, reply_markup=markup, parse_mode="Markdown")
 
+    # Solo registramos preguntas/respuestas FAQ, no los datos personales del flujo
+    if not in_flow:
+        log_conversation(user_id, text, response)
+
 # -------------------------------------------------------
 # MAIN
 # -------------------------------------------------------
-def start_bot():
-    token = os.getenv("TELEGRAM_TOKEN")
-    app = ApplicationBuilder().token(token).build()
+class InstrumentedRequest(BaseRequest):
+    """Envuelve el cliente HTTP del bot para medir cada método de la API de Telegram"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    @property
+    def read_timeout(self):
+        return self.inner.read_timeout
+
+    async def initialize(self):
+        await self.inner.initialize()
+
+    async def shutdown(self):
+        await self.inner.shutdown()
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        # El método de la API es lo último de la URL (sendMessage, editMessageText...)
+        with track_external("telegram", url.rsplit("/", 1)[-1]):
+            return await self.inner.do_request(
+                url, method, request_data=request_data, read_timeout=read_timeout,
+                write_timeout=write_timeout, connect_timeout=connect_timeout,
+                pool_timeout=pool_timeout
+            )
+
+async def post_init(app):
+    # Tarea de fondo que guarda las conversaciones por lotes
+    conversation_logger.start()
+    # Endpoint /metrics y volcado periódico (si están configurados)
+    metrics.start()
+
+async def post_shutdown(app):
+    await conversation_logger.stop()
+
+def build_application(polling=True, token=None, request=None):
+    """
+    Aplicación con todos los handlers; sin Updater cuando llega por webhook.
+    `request` reemplaza el cliente HTTP de la API de Telegram (pruebas de carga).
+    """
+    token = token or os.getenv("TELEGRAM_TOKEN")
+    # Usuarios distintos en paralelo, cada usuario en orden de llegada
+    processor = PerUserUpdateProcessor()
+    metrics.register_collector("csdc_updates", processor.get_stats)
+    builder = ApplicationBuilder().token(token).concurrent_updates(processor)
+    builder = builder.post_init(post_init).post_shutdown(post_shutdown)
+    # Mismo pool que arma ApplicationBuilder por defecto, con tiempos por método
+    builder = builder.request(InstrumentedRequest(request or HTTPXRequest(connection_pool_size=256)))
+    if not polling:
+        builder = builder.updater(None)
+    app = builder.build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CallbackQueryHandler(button_handler))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    return app
+
+def start_bot():
+    app = build_application()
 
     print("🤖 CSDC Assistant actualizado y corriendo...")
     app.run_polling()
\ No newline at end of file
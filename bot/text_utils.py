@@ -0,0 +1,19 @@
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+def fold_accents(text):
+    """Quita tildes y diacríticos (á -> a, ñ -> n)"""
+    if text.isascii():
+        # Nada que descomponer; evita la normalización en la mayoría de mensajes
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def normalize_message(message):
+    """Minúsculas, sin tildes, sin signos de puntuación y espacios colapsados"""
+    text = fold_accents(message.lower())
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
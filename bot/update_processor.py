@@ -0,0 +1,99 @@
+import asyncio
+import os
+import threading
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Updates ejecutándose a la vez (usuarios distintos) y updates admitidos en espera
+BOT_MAX_CONCURRENT_UPDATES = int(os.getenv("BOT_MAX_CONCURRENT_UPDATES", "64"))
+BOT_MAX_PENDING_UPDATES = int(os.getenv("BOT_MAX_PENDING_UPDATES", "4096"))
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Procesa updates de usuarios distintos en paralelo (hasta `max_running`) y
+    los de un mismo usuario uno a la vez, en orden de llegada.
+
+    El semáforo de la clase base solo limita cuántos updates se admiten; el
+    límite real de ejecución se toma después del candado del usuario, así los
+    mensajes en cola de un usuario no ocupan cupos que otro podría usar.
+    """
+
+    def __init__(self, max_running=BOT_MAX_CONCURRENT_UPDATES,
+                 max_pending=BOT_MAX_PENDING_UPDATES):
+        super().__init__(max(max_pending, max_running))
+        self.max_running = max_running
+        self._running = asyncio.BoundedSemaphore(max_running)
+        self._user_locks = {}
+        self._depths = {}
+        # get_stats() corre en el hilo de métricas: contadores y _depths se
+        # cambian bajo este lock y se leen como copia
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "processed": 0, "running": 0, "max_user_depth": 0, "active_users": 0, "pending": 0
+        }
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @staticmethod
+    def _user_key(update):
+        if isinstance(update, Update) and update.effective_user:
+            return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        user_id = self._user_key(update)
+        if user_id is None:
+            async with self._running:
+                await coroutine
+            with self._stats_lock:
+                self.stats["processed"] += 1
+            return
+
+        with self._stats_lock:
+            depth = self._depths.get(user_id, 0) + 1
+            self._depths[user_id] = depth
+            self.stats["pending"] += 1
+            self.stats["active_users"] = len(self._depths)
+            if depth > self.stats["max_user_depth"]:
+                self.stats["max_user_depth"] = depth
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+
+        try:
+            # asyncio.Lock despierta en orden FIFO: se respeta el orden de llegada
+            async with lock:
+                async with self._running:
+                    with self._stats_lock:
+                        self.stats["running"] += 1
+                    try:
+                        await coroutine
+                    finally:
+                        with self._stats_lock:
+                            self.stats["running"] -= 1
+        finally:
+            with self._stats_lock:
+                self.stats["processed"] += 1
+                self.stats["pending"] -= 1
+                depth = self._depths[user_id] - 1
+                if depth:
+                    self._depths[user_id] = depth
+                else:
+                    del self._depths[user_id]
+                    del self._user_locks[user_id]
+                self.stats["active_users"] = len(self._depths)
+
+    def queue_depths(self):
+        """Updates pendientes (incluido el que se ejecuta) por user_id"""
+        with self._stats_lock:
+            return dict(self._depths)
+
+    def get_stats(self):
+        with self._stats_lock:
+            return dict(self.stats)
@@ -0,0 +1,222 @@
+import asyncio
+import hmac
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+from telegram import Update
+
+load_dotenv()
+
+# URL pública que Telegram llamará (p. ej. https://bot.midominio.edu/telegram)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# Obligatorio: Telegram lo manda en cada llamada y sin él cualquiera podría inyectar updates
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", str(os.cpu_count() or 1)))
+# Updates pendientes por worker antes de responder 503 (Telegram reintenta)
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_ENQUEUE_TIMEOUT = 2.0
+# Espera mínima entre reinicios de un mismo worker (si muere al arrancar)
+WEBHOOK_RESPAWN_DELAY = float(os.getenv("WEBHOOK_RESPAWN_DELAY", "5"))
+
+# Tipos de update que traen el usuario en "from"
+_USER_FIELDS = (
+    "message", "edited_message", "callback_query", "inline_query",
+    "chosen_inline_result", "shipping_query", "pre_checkout_query",
+    "my_chat_member", "chat_member", "chat_join_request",
+)
+
+def update_user_id(data):
+    """user_id del update crudo (JSON de Telegram), o None si no tiene usuario"""
+    for field in _USER_FIELDS:
+        payload = data.get(field)
+        if payload and "from" in payload:
+            return payload["from"]["id"]
+    return None
+
+def route_update(data, n_workers):
+    """
+    Worker que atiende el update. Todo lo de un mismo usuario cae siempre en el
+    mismo worker, así su flujo (user_states y user_data) vive en un solo proceso.
+    """
+    user_id = update_user_id(data)
+    key = user_id if user_id is not None else data.get("update_id", 0)
+    return key % n_workers
+
+def parse_update(data, bot=None):
+    """Update de python-telegram-bot a partir del JSON crudo; ValueError si no tiene esa forma"""
+    try:
+        update = Update.de_json(data, bot)
+    except Exception as e:
+        # Faltan campos obligatorios o traen otro tipo (TypeError, KeyError, ValueError...)
+        raise ValueError(f"update inválido: {e}") from e
+    if update is None:
+        raise ValueError("update vacío")
+    return update
+
+
+# -------------------------------------------------------
+# WORKERS
+# -------------------------------------------------------
+async def _forward_updates(app, updates):
+    """Pasa los updates de la cola del proceso a la aplicación hasta recibir None"""
+    loop = asyncio.get_running_loop()
+    while True:
+        data = await loop.run_in_executor(None, updates.get)
+        if data is None:
+            return
+        try:
+            update = parse_update(data, app.bot)
+        except ValueError as e:
+            # Un update malo se descarta; el worker sigue atendiendo a los demás
+            print(f"Error webhook: {e}")
+            continue
+        await app.update_queue.put(update)
+
+async def _run_worker(index, updates):
+    from bot import conversation_logger, db, metrics
+    from bot.telegram_bot import build_application, post_init, post_shutdown
+
+    metrics.configure_worker(index)
+    db.configure_worker(index)
+    conversation_logger.configure_worker(index)
+
+    app = build_application(polling=False)
+
+    # post_init/post_shutdown solo los llama run_polling; aquí van a mano
+    async with app:
+        await post_init(app)
+        await app.start()
+        print(f"🤖 Worker {index} listo (pid {os.getpid()})")
+        await _forward_updates(app, updates)
+        await app.stop()
+        await post_shutdown(app)
+
+def _worker_main(index, updates):
+    try:
+        asyncio.run(_run_worker(index, updates))
+    except KeyboardInterrupt:
+        pass
+
+def _spawn_worker(ctx, index, updates):
+    worker = ctx.Process(target=_worker_main, args=(index, updates), name=f"csdc-worker-{index}", daemon=True)
+    worker.start()
+    return worker
+
+def _supervise(ctx, workers, worker_queues, stopping):
+    """Reinicia los workers que mueren; mientras tanto su parte de los updates recibe 503"""
+    spawned_at = [time.monotonic()] * len(workers)
+    while not stopping.wait(1.0):
+        for i, worker in enumerate(workers):
+            if worker.is_alive() or time.monotonic() - spawned_at[i] < WEBHOOK_RESPAWN_DELAY:
+                continue
+            print(f"⚠️ Worker {i} terminó (código {worker.exitcode}); reiniciando")
+            workers[i] = _spawn_worker(ctx, i, worker_queues[i])
+            spawned_at[i] = time.monotonic()
+
+
+# -------------------------------------------------------
+# LISTENER HTTP
+# -------------------------------------------------------
+def _make_handler(worker_queues, workers):
+    class TelegramWebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != WEBHOOK_PATH:
+                self.send_error(404)
+                return
+
+            token = self.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if WEBHOOK_SECRET and not hmac.compare_digest(token, WEBHOOK_SECRET):
+                self.send_error(403)
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length))
+            except (ValueError, json.JSONDecodeError):
+                self.send_error(400)
+                return
+            if not isinstance(data, dict):
+                # JSON válido pero no es un update ([], 1, "texto")
+                self.send_error(400)
+                return
+            try:
+                index = route_update(data, len(worker_queues))
+                # Mismo parseo que hará el worker: lo que no sea un update válido no se encola
+                parse_update(data)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                self.send_error(400)
+                return
+
+            if not workers[index].is_alive():
+                # Sin worker que lo atienda no se confirma: Telegram lo reintenta
+                self.send_error(503)
+                return
+
+            target = worker_queues[index]
+            try:
+                target.put(data, timeout=WEBHOOK_ENQUEUE_TIMEOUT)
+            except queue.Full:
+                # Worker saturado: Telegram reintentará el update más tarde
+                self.send_error(503)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return TelegramWebhookHandler
+
+async def _set_webhook():
+    from telegram import Bot
+
+    async with Bot(os.getenv("TELEGRAM_TOKEN")) as bot:
+        await bot.set_webhook(
+            url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET or None,
+            max_connections=100
+        )
+
+def start_webhook(n_workers=WEBHOOK_WORKERS):
+    """Listener HTTP local que reparte los updates entre N procesos worker"""
+    if not WEBHOOK_URL:
+        raise RuntimeError("Define WEBHOOK_URL para usar el modo webhook")
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("Define WEBHOOK_SECRET para usar el modo webhook (A-Z, a-z, 0-9, _ y -)")
+
+    ctx = multiprocessing.get_context("spawn")
+    worker_queues = [ctx.Queue(maxsize=WEBHOOK_QUEUE_SIZE) for _ in range(n_workers)]
+    workers = [_spawn_worker(ctx, i, q) for i, q in enumerate(worker_queues)]
+    stopping = threading.Event()
+    supervisor = threading.Thread(
+        target=_supervise, args=(ctx, workers, worker_queues, stopping), name="csdc-supervisor", daemon=True
+    )
+    supervisor.start()
+
+    asyncio.run(_set_webhook())
+
+    server = ThreadingHTTPServer((WEBHOOK_LISTEN, WEBHOOK_PORT), _make_handler(worker_queues, workers))
+    print(f"🤖 CSDC Assistant en modo webhook: {n_workers} workers en "
+          f"{WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping.set()
+        supervisor.join()
+        server.server_close()
+        for q in worker_queues:
+            q.put(None)
+        for worker in workers:
+            worker.join(timeout=10)
@@ -0,0 +1,246 @@
+import glob
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+CURRENT_JOURNAL = "current.jsonl"
+# Filas que la base de datos rechaza (dato inválido): se apartan para revisión
+DEAD_LETTER = "dead_letter.jsonl"
+LOCK_FILE = "writer.lock"
+
+
+class WriteBehindWriter:
+    """
+    Buffer de escritura diferida con diario local (append-only).
+
+    append() escribe la fila en el diario y hace fsync antes de volver: a partir
+    de ahí la fila sobrevive a una caída del proceso. Un hilo de fondo junta las
+    filas y llama a `insert_batch(rows)` (una sola transacción) cada
+    `flush_rows` filas o cada `flush_interval` segundos, lo que ocurra primero.
+
+    Cada lote se sella en su propio segmento del diario y el segmento se borra
+    solo después del COMMIT. Al arrancar se reenvían los segmentos que quedaron
+    pendientes, así que la entrega es "al menos una vez": una caída justo entre
+    el COMMIT y el borrado puede repetir ese lote.
+
+    Si un lote falla con un error que no está en `transient_errors` (o falla
+    `max_attempts` veces seguidas), se reintenta fila por fila: las que la
+    base de datos rechaza van a `dead_letter.jsonl` y el resto se inserta,
+    así una fila inválida no bloquea a las siguientes.
+
+    El directorio del diario es de un solo proceso: se toma con un bloqueo
+    exclusivo y otro writer sobre el mismo directorio falla al crearse.
+    """
+
+    def __init__(self, journal_dir, insert_batch, flush_rows=100, flush_interval=0.2,
+                 transient_errors=(), max_attempts=5):
+        self.journal_dir = journal_dir
+        self.insert_batch = insert_batch
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.transient_errors = tuple(transient_errors)
+        self.max_attempts = max_attempts
+        self.stats = {
+            "journaled": 0, "flushed": 0, "batches": 0, "errors": 0, "replayed": 0, "dead_lettered": 0
+        }
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self._lock_file = self._acquire_dir_lock()
+        self._cond = threading.Condition()
+        # Un solo envío a la vez (hilo de fondo o flush() explícito)
+        self._write_lock = threading.Lock()
+        self._pending = []
+        self._sealed = []
+        self._seq = 0
+        self._attempts = 0
+        self._closing = False
+
+        self._recover()
+        self._journal = open(self._current_path(), "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._run, name="csdc-write-behind", daemon=True)
+        self._thread.start()
+
+    def _acquire_dir_lock(self):
+        lock_file = open(os.path.join(self.journal_dir, LOCK_FILE), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(f"El diario {self.journal_dir} ya está en uso por otro proceso")
+        return lock_file
+
+    def _current_path(self):
+        return os.path.join(self.journal_dir, CURRENT_JOURNAL)
+
+    @staticmethod
+    def _read_rows(path):
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir durante una caída: nunca se confirmó
+                    continue
+        return rows
+
+    def _recover(self):
+        """Recupera segmentos sellados y el diario abierto de una ejecución anterior"""
+        segments = sorted(glob.glob(os.path.join(self.journal_dir, "segment-*.jsonl")))
+        for path in segments:
+            self._seq = max(self._seq, int(os.path.basename(path)[8:-6]))
+            self._sealed.append((path, self._read_rows(path)))
+
+        current = self._current_path()
+        if os.path.exists(current):
+            rows = self._read_rows(current)
+            if rows:
+                self._seq += 1
+                path = os.path.join(self.journal_dir, f"segment-{self._seq:08d}.jsonl")
+                os.replace(current, path)
+                self._sealed.append((path, rows))
+            else:
+                os.remove(current)
+
+        self.stats["replayed"] = sum(len(rows) for _, rows in self._sealed)
+
+    def append(self, row):
+        """Agrega una fila; vuelve cuando ya está en disco (fsync)"""
+        line = json.dumps(row, ensure_ascii=False) + "\n"
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("WriteBehindWriter cerrado")
+            self._journal.write(line)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._pending.append(row)
+            self.stats["journaled"] += 1
+            if len(self._pending) >= self.flush_rows:
+                self._cond.notify()
+
+    def _seal(self):
+        """Convierte las filas pendientes en un segmento listo para enviar (con el lock tomado)"""
+        if not self._pending:
+            return
+        self._journal.close()
+        self._seq += 1
+        path = os.path.join(self.journal_dir, f"segment-{self._seq:08d}.jsonl")
+        os.replace(self._current_path(), path)
+        self._sealed.append((path, self._pending))
+        self._pending = []
+        self._journal = open(self._current_path(), "a", encoding="utf-8")
+
+    def _write_sealed(self):
+        with self._write_lock:
+            return self._write_sealed_locked()
+
+    def _write_sealed_locked(self):
+        while True:
+            with self._cond:
+                if not self._sealed:
+                    return True
+                path, rows = self._sealed[0]
+            try:
+                self.insert_batch(rows)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self._attempts += 1
+                print(f"Error DB (write-behind): {e}")
+                if isinstance(e, self.transient_errors) and self._attempts < self.max_attempts:
+                    # Base de datos caída: el segmento queda en disco y se reintenta en el próximo ciclo
+                    return False
+                if not self._write_rows_one_by_one(path, rows):
+                    return False
+                continue
+            self._attempts = 0
+            os.remove(path)
+            with self._cond:
+                self._sealed.pop(0)
+                self.stats["flushed"] += len(rows)
+                self.stats["batches"] += 1
+
+    def _write_rows_one_by_one(self, path, rows):
+        """
+        Aísla las filas que la base de datos rechaza. Devuelve False si un error
+        transitorio corta el proceso (las filas que faltan quedan en el segmento).
+        """
+        inserted = 0
+        for i, row in enumerate(rows):
+            try:
+                self.insert_batch([row])
+                inserted += 1
+            except self.transient_errors as e:
+                remaining = rows[i:]
+                self._rewrite_segment(path, remaining)
+                with self._cond:
+                    self._sealed[0] = (path, remaining)
+                    self.stats["flushed"] += inserted
+                print(f"Error DB (write-behind): {e}")
+                return False
+            except Exception as e:
+                self._dead_letter(row, e)
+        self._attempts = 0
+        os.remove(path)
+        with self._cond:
+            self._sealed.pop(0)
+            self.stats["flushed"] += inserted
+            self.stats["batches"] += 1
+        return True
+
+    def _rewrite_segment(self, path, rows):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _dead_letter(self, row, error):
+        line = json.dumps({"row": row, "error": str(error)}, ensure_ascii=False) + "\n"
+        with open(os.path.join(self.journal_dir, DEAD_LETTER), "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._cond:
+            self.stats["dead_lettered"] += 1
+        print(f"Error DB (write-behind): fila apartada en {DEAD_LETTER}: {error}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closing and len(self._pending) < self.flush_rows:
+                    self._cond.wait(timeout=self.flush_interval)
+                self._seal()
+                closing = self._closing
+            self._write_sealed()
+            if closing:
+                # Si la base de datos sigue caída, el diario se reenvía al reiniciar
+                return
+
+    def flush(self):
+        """Envía de inmediato todo lo pendiente (bloqueante)"""
+        with self._cond:
+            self._seal()
+        return self._write_sealed()
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        self._journal.close()
+        self._lock_file.close()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["buffered"] = len(self._pending) + sum(len(r) for _, r in self._sealed)
+        return stats
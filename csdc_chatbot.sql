@@ -16,9 +16,26 @@ CREATE TABLE requests (
     correo VARCHAR(150),
     tipo_solicitud VARCHAR(150),
     detalle TEXT,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_requests_timestamp (timestamp),
+    INDEX idx_requests_user_id (user_id),
+    FULLTEXT INDEX ft_requests_busqueda (nombre, correo, detalle)
+);
+
+CREATE TABLE request_rollup_hourly (
+    hour_start DATETIME NOT NULL,
+    tipo_solicitud VARCHAR(150) NOT NULL,
+    count INT NOT NULL,
+    PRIMARY KEY (hour_start, tipo_solicitud)
 );
 
+CREATE TABLE rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_id INT NOT NULL
+);
+
+INSERT INTO rollup_state (name, last_id) VALUES ('request_rollup_hourly', 0);
+
 -- Opcional: Si quieres limpiar la tabla antes de insertar (quitar los guiones si deseas ejecutarlo)
 -- TRUNCATE TABLE requests;
 -- TRUNCATE TABLE conversations;
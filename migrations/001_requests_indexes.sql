@@ -0,0 +1,7 @@
+-- Índices para las agregaciones del dashboard por rango de fechas.
+-- (timestamp): tendencia, mapa de calor, "Hoy" y MIN/MAX de fechas.
+-- (tipo_solicitud, timestamp): distribución por tipo dentro del rango.
+USE csdc_chatbot;
+
+CREATE INDEX idx_requests_timestamp ON requests (timestamp);
+CREATE INDEX idx_requests_tipo_timestamp ON requests (tipo_solicitud, timestamp);
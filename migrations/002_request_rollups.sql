@@ -0,0 +1,19 @@
+-- Rollups horarios de solicitudes (conteo por hora x tipo_solicitud).
+-- hour_start está en hora del servidor (UTC), igual que requests.timestamp.
+-- Se mantienen con: python -m streamlit_app.rollups compact
+USE csdc_chatbot;
+
+CREATE TABLE request_rollup_hourly (
+    hour_start DATETIME NOT NULL,
+    tipo_solicitud VARCHAR(150) NOT NULL,
+    count INT NOT NULL,
+    PRIMARY KEY (hour_start, tipo_solicitud)
+);
+
+-- Último id de requests ya sumado a los rollups
+CREATE TABLE rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_id INT NOT NULL
+);
+
+INSERT INTO rollup_state (name, last_id) VALUES ('request_rollup_hourly', 0);
@@ -0,0 +1,6 @@
+-- Índice FULLTEXT para la búsqueda del dashboard (nombre, correo y detalle).
+-- InnoDB indexa palabras de al menos innodb_ft_min_token_size (3) letras;
+-- la búsqueda usa BOOLEAN MODE con prefijos, así que "jper" encuentra "jperez@...".
+USE csdc_chatbot;
+
+ALTER TABLE requests ADD FULLTEXT INDEX ft_requests_busqueda (nombre, correo, detalle);
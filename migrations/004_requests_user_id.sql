@@ -0,0 +1,6 @@
+-- Índice para leer los destinatarios de los avisos masivos (run_broadcast.py):
+-- SELECT DISTINCT user_id ... WHERE user_id > %s ORDER BY user_id LIMIT n
+-- recorre el índice por lotes en lugar de ordenar la tabla completa.
+USE csdc_chatbot;
+
+CREATE INDEX idx_requests_user_id ON requests (user_id);
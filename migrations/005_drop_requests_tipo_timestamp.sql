@@ -0,0 +1,7 @@
+-- Quita idx_requests_tipo_timestamp (ver 001): la distribución por tipo sale
+-- de request_rollup_hourly desde 002 y ninguna consulta filtra requests por
+-- tipo y fecha. El aviso masivo por tipo (broadcast.py) recorre
+-- idx_requests_user_id. Cada INSERT dejaba de mantener un índice sin uso.
+USE csdc_chatbot;
+
+DROP INDEX idx_requests_tipo_timestamp ON requests;
@@ -0,0 +1,4 @@
+from bot.broadcast import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from bot.webhook import start_webhook
+
+if __name__ == "__main__":
+    start_webhook()
\ No newline at end of file
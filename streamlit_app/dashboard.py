@@ -13,7 +13,18 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-from bot.db import get_connection
+from streamlit_app.queries import (
+    get_date_bounds,
+    get_day_count,
+    get_hourly_counts,
+    get_requests_page,
+    get_request_detail,
+    search_requests
+)
+from streamlit_app.rollups import get_watermark
+from streamlit_app.data_loader import RequestsFrameStore
+from streamlit_app.summary import compute_summary
+from streamlit_app.export import EXPORT_DASHBOARD_MAX_ROWS, FORMATS as EXPORT_FORMATS, export_to_file
 
 # Definimos la Zona Horaria de El Salvador
 TZ_SV = pytz.timezone('America/El_Salvador')
@@ -129,27 +140,68 @@ st.markdown("""
 # -------------------------------
 # 3. CARGA DE DATOS
 # -------------------------------
-def load_data():
-    try:
-        conn = get_connection()
-        if conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM requests ORDER BY timestamp DESC")
-            rows = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return pd.DataFrame(rows)
-    except Exception as e:
-        st.error(f"Error DB: {e}")
-        return pd.DataFrame()
-
-df = load_data()
-
-
-if not df.empty:
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    # Restamos 6 horas para ajustar la hora del servidor (UTC) a El Salvador
-    df["timestamp"] = df["timestamp"] - pd.Timedelta(hours=6)
+PAGE_SIZES = [25, 50, 100]
+
+# "rollups": KPIs desde request_rollup_hourly en MySQL (los mantiene al día
+# `python -m streamlit_app.rollups compact --every 15`; el dashboard solo lee).
+# "snapshot": KPIs desde el snapshot local de requests (ver data_loader.py).
+DATA_SOURCE = os.getenv("DASHBOARD_DATA_SOURCE", "rollups")
+
+# Cada cuánto se revisa si hay solicitudes nuevas
+POLL_SECONDS = float(os.getenv("DASHBOARD_POLL_SECONDS", "15"))
+
+@st.cache_resource
+def get_requests_store():
+    # Un solo DataFrame para todas las sesiones; arranca desde el snapshot en disco
+    return RequestsFrameStore()
+
+@st.cache_data(ttl=POLL_SECONDS, show_spinner=False)
+def data_version():
+    """
+    Versión de los datos que ya refleja la fuente de los KPIs. Se calcula a lo
+    sumo una vez por intervalo para todo el servidor, sin importar cuántos
+    operadores tengan el dashboard abierto. Con el snapshot, de paso incorpora
+    las filas nuevas (en memoria y en disco local, nunca escribe en MySQL).
+    """
+    if DATA_SOURCE == "snapshot":
+        store = get_requests_store()
+        # Solo trae las filas nuevas (y las de la ventana de atraso)
+        store.refresh()
+        return store.version
+    return get_watermark()
+
+# Los resultados se guardan por versión de datos: mientras no lleguen
+# solicitudes, los reruns (paginar, buscar, otro operador con el mismo
+# rango) no vuelven a consultar ni a recalcular.
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_date_bounds(version):
+    if DATA_SOURCE == "snapshot":
+        df = get_requests_store().df
+        if df.empty:
+            return None
+        return df["timestamp"].min().date(), df["timestamp"].max().date()
+    return get_date_bounds()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_summary(start, end, hoy, version):
+    """(resumen del rango, solicitudes de hoy)"""
+    if DATA_SOURCE == "snapshot":
+        store = get_requests_store()
+        summary = compute_summary(store.range(start, end), today=hoy)
+        sol_hoy = summary.today if start <= hoy <= end else len(store.range(hoy, hoy))
+        return summary, sol_hoy
+    summary = compute_summary(get_hourly_counts(start, end), today=hoy)
+    # "Hoy" no depende del filtro de fechas
+    sol_hoy = summary.today if start <= hoy <= end else get_day_count(hoy)
+    return summary, sol_hoy
+
+try:
+    version = data_version()
+    date_bounds = load_date_bounds(version)
+except Exception as e:
+    st.error(f"Error DB: {e}")
+    version = None
+    date_bounds = None
 
 # -------------------------------
 # 4. SIDEBAR (Código Modificado)
@@ -159,9 +211,8 @@ with st.sidebar:
     st.markdown("Panel de Control")
     st.markdown("---")
     
-    if not df.empty:
-        min_date = df["timestamp"].min().date()
-        max_date = df["timestamp"].max().date()
+    if date_bounds:
+        min_date, max_date = date_bounds
         
         date_range = st.date_input(
             "📅 Fechas:",
@@ -190,8 +241,24 @@ with st.sidebar:
     # --- FIN DEL TRUCO ---
 
     if st.button("Actualizar", type="secondary", use_container_width=True):
+        # Revisa ya, sin esperar al siguiente intervalo
+        data_version.clear()
         st.rerun()
 
+    # Revisión periódica: solo este fragmento corre cada POLL_SECONDS; la
+    # página completa se vuelve a dibujar únicamente si hay datos nuevos
+    @st.fragment(run_every=POLL_SECONDS)
+    def watch_for_changes(shown_version):
+        try:
+            changed = data_version() != shown_version
+        except Exception:
+            changed = False
+        if changed:
+            st.rerun(scope="app")
+        st.caption(f"🟢 En vivo · se revisa cada {POLL_SECONDS:.0f} s")
+
+    watch_for_changes(version)
+
 # ---------------------------------------------------------
     # BOTÓN TELEGRAM: Minimalista (Solo Color Oficial)
     # ---------------------------------------------------------
@@ -218,21 +285,22 @@ with st.sidebar:
 # -------------------------------
 # 5. LÓGICA
 # -------------------------------
-if df.empty:
+if not date_bounds:
     st.info("👋 Esperando datos...")
     st.stop()
 
 if len(date_range) == 2:
     start, end = date_range
-    mask = (df["timestamp"].dt.date >= start) & (df["timestamp"].dt.date <= end)
-    df_filtered = df[mask]
 else:
-    df_filtered = df
+    start, end = date_bounds
 
-df_filtered["date"] = df_filtered["timestamp"].dt.date
-df_filtered["hour"] = df_filtered["timestamp"].dt.hour
-dias_map = {0:"Lun", 1:"Mar", 2:"Mié", 3:"Jue", 4:"Vie", 5:"Sáb", 6:"Dom"}
-df_filtered["day_name"] = df_filtered["timestamp"].dt.dayofweek.map(dias_map)
+# KPIs, gráficas e insights en una sola pasada sobre el rango
+hoy = datetime.now(TZ_SV).date()
+try:
+    summary, sol_hoy = load_summary(start, end, hoy, version)
+except Exception as e:
+    st.error(f"Error DB: {e}")
+    st.stop()
 
 # -------------------------------
 # 6. DASHBOARD VISUAL
@@ -260,16 +328,12 @@ with c2:
 st.markdown("---")
 
 # --- A. KPIs (Blue Style) ---
-total = len(df_filtered)
-
-# 
-hoy = datetime.now(TZ_SV).date()
-sol_hoy = len(df[df["timestamp"].dt.date == hoy])
+total = summary.total
 
-if not df_filtered.empty:
-    top_tramite = df_filtered["tipo_solicitud"].mode()[0]
+if total:
+    top_tramite = summary.top_tramite
     # Formateo bonito de hora pico
-    hora_pico_val = df_filtered['hour'].mode()[0]
+    hora_pico_val = summary.peak_hour
     hora_pico = f"{hora_pico_val:02d}:00"
 else:
     top_tramite = "--"
@@ -299,11 +363,9 @@ blue_palette = ['#172554', '#1e3a8a', '#1d4ed8', '#0e7490', '#155e75']
 
 with c_left:
     st.subheader("📈 Tendencia")
-    if not df_filtered.empty:
-        trend = df_filtered.groupby("date").size().reset_index(name="count")
-        
+    if total:
         fig_trend = px.area(
-            trend, x="date", y="count", 
+            summary.trend, x="date", y="count", 
             template="plotly_white",
             height=380
         )
@@ -323,12 +385,10 @@ with c_left:
 
 with c_right:
     st.subheader("📊 Distribución")
-    if not df_filtered.empty:
-        dist = df_filtered["tipo_solicitud"].value_counts()
-        
+    if total:
         fig_pie = px.pie(
-            values=dist.values, 
-            names=dist.index, 
+            values=summary.distribution["count"], 
+            names=summary.distribution["tipo_solicitud"], 
             hole=0.7,
             color_discrete_sequence=blue_palette # Aplicando paleta azul
         )
@@ -347,16 +407,9 @@ c_map, c_insights = st.columns([1, 1])
 
 with c_map:
     st.subheader("🗓️ Intensidad Semanal")
-    if not df_filtered.empty:
-        heat = df_filtered.pivot_table(
-            index="day_name", 
-            columns="hour", 
-            values="id", 
-            aggfunc="count", 
-            fill_value=0
-        )
+    if total:
         order = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
-        heat = heat.reindex(order)
+        heat = pd.DataFrame(summary.heatmap, index=order, columns=range(24))
         
         fig_heat = px.imshow(
             heat,
@@ -372,9 +425,9 @@ with c_insights:
     
     html_content = ""
     
-    if not df_filtered.empty:
-        pct_top = int((df_filtered["tipo_solicitud"].value_counts().max() / total) * 100)
-        h_pico = df_filtered["hour"].mode()[0]
+    if total:
+        pct_top = summary.top_share_pct
+        h_pico = hora_pico_val
         
         # Tarjeta 1
         html_content += f"""<div class="insight-item"><strong>🔥 Patrón Dominante</strong>El {pct_top}% de las solicitudes son <b>'{top_tramite}'</b>.</div>"""
@@ -401,13 +454,96 @@ with c_insights:
 st.markdown("###")
 st.subheader("📋 Últimos Registros")
 with st.expander("Ver tabla completa", expanded=True):
-    st.dataframe(
-        df_filtered[["timestamp", "nombre", "correo", "tipo_solicitud", "detalle"]],
-        column_config={
-            "timestamp": st.column_config.DatetimeColumn("Fecha", format="DD MMM, HH:mm"),
-            "tipo_solicitud": st.column_config.TextColumn("Tipo", width="medium"),
-            "detalle": st.column_config.TextColumn("Detalle", width="large"),
-        },
-        use_container_width=True,
-        hide_index=True
-    )
\ No newline at end of file
+    col_buscar, col_tamano = st.columns([3, 1])
+    with col_buscar:
+        busqueda = st.text_input("🔎 Buscar (nombre, correo o detalle)", key="tabla_busqueda").strip()
+    with col_tamano:
+        page_size = st.selectbox("Filas por página", PAGE_SIZES, index=1, key="tabla_page_size")
+
+    config_tabla = {
+        "timestamp": st.column_config.DatetimeColumn("Fecha", format="DD MMM, HH:mm"),
+        "tipo_solicitud": st.column_config.TextColumn("Tipo", width="medium"),
+        "detalle": st.column_config.TextColumn("Detalle", width="large"),
+    }
+
+    if busqueda:
+        # Resultados por relevancia desde el índice FULLTEXT
+        pagina, busqueda_ms = search_requests(busqueda, start, end, limit=page_size)
+        evento = st.dataframe(
+            pagina[["timestamp", "nombre", "correo", "tipo_solicitud", "detalle"]],
+            column_config=config_tabla,
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key="tabla_busqueda_resultados"
+        )
+        st.caption(f"{len(pagina)} resultados más relevantes · {busqueda_ms:.0f} ms")
+    else:
+        # Pila de llaves (timestamp, id) de cada página visitada; se reinicia
+        # cuando cambian los filtros
+        filtros = (start, end, page_size)
+        if st.session_state.get("tabla_filtros") != filtros:
+            st.session_state["tabla_filtros"] = filtros
+            st.session_state["tabla_llaves"] = [None]
+        llaves = st.session_state["tabla_llaves"]
+
+        pagina, siguiente = get_requests_page(start, end, page_size, after=llaves[-1])
+
+        evento = st.dataframe(
+            pagina[["timestamp", "nombre", "correo", "tipo_solicitud", "detalle"]],
+            column_config=config_tabla,
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=f"tabla_registros_{len(llaves)}"
+        )
+
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("← Anterior", disabled=len(llaves) == 1, use_container_width=True):
+                llaves.pop()
+                st.rerun()
+        with col_info:
+            st.caption(f"Página {len(llaves)} · {len(pagina)} registros")
+        with col_next:
+            if st.button("Siguiente →", disabled=siguiente is None, use_container_width=True):
+                llaves.append(siguiente)
+                st.rerun()
+
+    # El detalle completo solo se trae para la fila seleccionada
+    seleccion = evento.selection.rows
+    if seleccion:
+        fila = pagina.iloc[seleccion[0]]
+        st.markdown(f"**{fila['nombre']}** · {fila['correo']} · {fila['tipo_solicitud']}")
+        st.text(get_request_detail(int(fila["id"])) or "")
+
+    # Exportación del rango de fechas completo (no solo la página visible);
+    # el archivo se genera por bloques al hacer clic, pero Streamlit lo sirve
+    # desde memoria: los rangos grandes se exportan con el script
+    col_formato, col_descarga = st.columns([1, 3])
+    with col_formato:
+        formato = st.selectbox("Formato", list(EXPORT_FORMATS), key="export_formato", label_visibility="collapsed")
+    with col_descarga:
+        mime, extension = EXPORT_FORMATS[formato]
+        file_name = f"solicitudes_{start:%Y%m%d}_{end:%Y%m%d}{extension}"
+        demasiadas = total > EXPORT_DASHBOARD_MAX_ROWS
+        st.download_button(
+            f"⬇️ Exportar {start:%d/%m/%Y} – {end:%d/%m/%Y}",
+            data=lambda: export_to_file(formato, start, end),
+            file_name=file_name,
+            mime=mime,
+            on_click="ignore",
+            disabled=demasiadas
+        )
+        if demasiadas:
+            st.caption(
+                f"El rango tiene {total:,} solicitudes (máximo {EXPORT_DASHBOARD_MAX_ROWS:,} desde aquí). "
+                "Expórtalas desde el servidor:"
+            )
+            st.code(
+                f"python -m streamlit_app.export --format {formato} --out {file_name} "
+                f"--start {start:%Y-%m-%d} --end {end:%Y-%m-%d}",
+                language="bash"
+            )
@@ -0,0 +1,184 @@
+import glob
+import os
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from bot.db import get_connection
+from streamlit_app.queries import SERVER_UTC_OFFSET_HOURS
+from streamlit_app.rollups import COMPACT_LAG_SECONDS
+
+# El servidor guarda en UTC; el dashboard muestra hora de El Salvador
+SERVER_UTC_OFFSET = pd.Timedelta(hours=SERVER_UTC_OFFSET_HOURS)
+
+# Snapshot en disco (Arrow IPC sin compresión: se lee sin descomprimir)
+SNAPSHOT_DIR = os.getenv("DASHBOARD_SNAPSHOT_DIR", "dashboard_snapshot")
+# Con más partes que esto, se compactan en una sola al guardar
+SNAPSHOT_MAX_PARTS = int(os.getenv("DASHBOARD_SNAPSHOT_MAX_PARTS", "16"))
+
+# Solo lo que necesitan los KPIs; la tabla de registros consulta MySQL por página
+REQUEST_COLUMNS = ["id", "timestamp", "tipo_solicitud"]
+
+
+def _prepare(rows, categories=()):
+    frame = pd.DataFrame(rows, columns=REQUEST_COLUMNS)
+    frame["id"] = frame["id"].astype("int64")
+    # Restamos 6 horas para ajustar la hora del servidor (UTC) a El Salvador
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"]).astype("datetime64[us]") - SERVER_UTC_OFFSET
+    tipos = frame["tipo_solicitud"].fillna("")
+    frame["tipo_solicitud"] = pd.Categorical(
+        tipos, categories=pd.Index(categories).union(pd.Index(tipos.unique()))
+    )
+    return frame
+
+
+class RequestsFrameStore:
+    """
+    DataFrame de `requests` (id, hora local, tipo categórico) que vive en
+    memoria entre reruns y sesiones, respaldado por un snapshot en disco.
+
+    Al crearse lee las partes del snapshot a pandas; refresh() solo trae de
+    MySQL las filas con id mayor al último visto y las guarda como una parte
+    nueva, así que ni el arranque en frío ni las actualizaciones releen la
+    tabla completa.
+
+    Un AUTO_INCREMENT menor puede confirmarse después de uno mayor, así que
+    refresh() vuelve a pedir las filas de los últimos COMPACT_LAG_SECONDS
+    segundos (como la compactación de rollups) y descarta las que ya tiene.
+    `settled_id` es el último id fuera de esa ventana; viaja en los metadatos
+    de cada parte del snapshot.
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self.df = _prepare([])
+        self.max_id = 0
+        self.settled_id = 0
+        # Cambia cada vez que llegan filas (max_id no cambia con una fila atrasada)
+        self.version = 0
+        # Ids ya cargados mayores que settled_id: refresh() los vuelve a recibir
+        self._unsettled = set()
+        self._lock = threading.Lock()
+        self._parts = []
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            self._load_snapshot()
+
+    # -------------------------------
+    # Snapshot
+    # -------------------------------
+    def _part_path(self, max_id):
+        return os.path.join(self.snapshot_dir, f"part-{max_id:012d}.arrow")
+
+    def _load_snapshot(self):
+        for stale in glob.glob(os.path.join(self.snapshot_dir, "*.tmp")):
+            os.remove(stale)
+        parts = sorted(glob.glob(os.path.join(self.snapshot_dir, "part-*.arrow")))
+        try:
+            tables = [feather.read_table(path) for path in parts]
+            settled = [
+                int(table.schema.metadata[b"settled_id"]) for table in tables
+                if b"settled_id" in (table.schema.metadata or {})
+            ]
+        except (OSError, pa.ArrowInvalid):
+            # Snapshot ilegible: se descarta y se reconstruye desde MySQL
+            for path in parts:
+                os.remove(path)
+            return
+        if not tables:
+            return
+        self._parts = parts
+        table = pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+        frame = table.to_pandas()
+        frame["tipo_solicitud"] = frame["tipo_solicitud"].astype("category")
+        duplicated = frame["id"].duplicated(keep="last")
+        if duplicated.any():
+            # Una compactación se cortó después de escribir la parte completa
+            # y antes de borrar las anteriores: sus filas están dos veces
+            frame = frame[~duplicated].sort_values("id", ignore_index=True)
+        self.df = frame
+        self.max_id = int(frame["id"].max())
+        # Snapshots sin el dato: se asume todo asentado, como antes
+        self.settled_id = max(settled) if settled else self.max_id
+        self._unsettled = set(frame["id"][frame["id"] > self.settled_id].tolist())
+        if duplicated.any():
+            self._compact()
+
+    def _write_part(self, frame):
+        path = self._part_path(int(frame["id"].max()))
+        tmp = path + ".tmp"
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**table.schema.metadata, b"settled_id": str(self.settled_id).encode()}
+        )
+        feather.write_feather(table, tmp, compression="uncompressed")
+        os.replace(tmp, path)
+        return path
+
+    def _save(self, new):
+        if not self.snapshot_dir:
+            return
+        if len(self._parts) + 1 > SNAPSHOT_MAX_PARTS:
+            self._compact()
+        else:
+            self._parts.append(self._write_part(new))
+
+    def _compact(self):
+        # Una sola parte con todo, luego borra las anteriores
+        path = self._write_part(self.df)
+        for old in self._parts:
+            if old != path:
+                os.remove(old)
+        self._parts = [path]
+
+    # -------------------------------
+    # Actualización
+    # -------------------------------
+    def _fetch_new(self):
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            # La última columna dice si la fila ya salió de la ventana de atraso
+            cursor.execute(
+                f"SELECT {', '.join(REQUEST_COLUMNS)}, timestamp < NOW() - INTERVAL %s SECOND "
+                "FROM requests WHERE id > %s ORDER BY id",
+                (COMPACT_LAG_SECONDS, self.settled_id)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+        return rows
+
+    def refresh(self):
+        """Agrega las filas nuevas y devuelve cuántas llegaron"""
+        with self._lock:
+            fetched = self._fetch_new()
+            settled = [row[0] for row in fetched if row[3]]
+            if settled:
+                self.settled_id = max(self.settled_id, settled[-1])
+            rows = [row[:3] for row in fetched if row[0] not in self._unsettled]
+            fetched_ids = {row[0] for row in rows}
+            self._unsettled = {i for i in self._unsettled | fetched_ids if i > self.settled_id}
+            if not rows:
+                return 0
+            current = self.df["tipo_solicitud"].cat.categories
+            new = _prepare(rows, categories=current)
+            categories = new["tipo_solicitud"].cat.categories
+            old = self.df.assign(
+                tipo_solicitud=self.df["tipo_solicitud"].cat.set_categories(categories)
+            )
+            # Mismas categorías en ambos lados: concat conserva el tipo categórico.
+            # Se reemplaza el DataFrame (nunca se modifica en sitio): otras
+            # sesiones pueden estar leyendo la versión anterior.
+            self.df = new if old.empty else pd.concat([old, new], ignore_index=True)
+            self.max_id = max(self.max_id, int(new["id"].max()))
+            self.version += 1
+            self._save(new)
+            return len(rows)
+
+    def range(self, start, end):
+        """Filas con fecha local entre start y end (inclusivas)"""
+        ts = self.df["timestamp"]
+        mask = (ts >= pd.Timestamp(start)) & (ts < pd.Timestamp(end) + pd.Timedelta(days=1))
+        return self.df[mask]
@@ -0,0 +1,162 @@
+"""
+Exportación de solicitudes a CSV o Parquet en memoria constante.
+
+Las filas se leen de MySQL con un cursor sin buffer (el servidor las envía
+a medida que se consumen) en bloques de EXPORT_CHUNK_ROWS y cada bloque se
+escribe al archivo antes de pedir el siguiente.
+
+    python -m streamlit_app.export --format parquet --out solicitudes.parquet
+    python -m streamlit_app.export --format csv --out ayer.csv --yesterday
+    python -m streamlit_app.export --format csv --out oct.csv --start 2025-10-01 --end 2025-10-31
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytz
+from bot.db import get_connection
+from streamlit_app.queries import SERVER_UTC_OFFSET_HOURS, utc_range
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+# Tamaño a partir del cual la descarga del dashboard pasa de RAM a disco
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+# Streamlit arma la descarga completa en memoria: con más filas que esto el
+# dashboard remite a este script
+EXPORT_DASHBOARD_MAX_ROWS = int(os.getenv("EXPORT_DASHBOARD_MAX_ROWS", "200000"))
+
+EXPORT_COLUMNS = ["id", "user_id", "nombre", "correo", "tipo_solicitud", "detalle", "timestamp"]
+PARQUET_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("user_id", pa.string()),
+    ("nombre", pa.string()),
+    ("correo", pa.string()),
+    ("tipo_solicitud", pa.string()),
+    ("detalle", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+])
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+def iter_request_chunks(start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    DataFrames de hasta `chunk_rows` solicitudes (hora local), en orden de
+    registro. Sin fechas, exporta toda la tabla.
+    """
+    sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM requests"
+    params = ()
+    if start is not None:
+        sql += " WHERE timestamp >= %s AND timestamp < %s"
+        params = utc_range(start, end)
+    sql += " ORDER BY timestamp, id"
+
+    offset = pd.Timedelta(hours=SERVER_UTC_OFFSET_HOURS)
+    conn = get_connection()
+    try:
+        # Sin buffer: el resultado no se carga completo en el cliente
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                chunk = pd.DataFrame(rows, columns=EXPORT_COLUMNS)
+                chunk["timestamp"] = pd.to_datetime(chunk["timestamp"]) - offset
+                yield chunk
+        finally:
+            # Un cursor sin buffer debe vaciarse antes de devolver la conexión
+            if cursor.with_rows:
+                cursor.fetchall()
+            cursor.close()
+    finally:
+        conn.close()
+
+
+def write_csv(chunks, out):
+    """Escribe los bloques en un stream de texto; devuelve las filas escritas"""
+    written = 0
+    for chunk in chunks:
+        chunk.to_csv(out, header=written == 0, index=False)
+        written += len(chunk)
+    if written == 0:
+        out.write(",".join(EXPORT_COLUMNS) + "\n")
+    return written
+
+
+def write_parquet(chunks, out):
+    """Escribe cada bloque como un row group; devuelve las filas escritas"""
+    written = 0
+    with pq.ParquetWriter(out, PARQUET_SCHEMA) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=PARQUET_SCHEMA, preserve_index=False))
+            written += len(chunk)
+    return written
+
+
+def export_requests(fmt, out, start=None, end=None):
+    """
+    Exporta las solicitudes del rango a `out` (ruta o archivo binario).
+    Devuelve cuántas filas se escribieron.
+    """
+    chunks = iter_request_chunks(start, end)
+    if fmt == "parquet":
+        return write_parquet(chunks, out)
+    if fmt != "csv":
+        raise ValueError(f"Formato no soportado: {fmt}")
+    if isinstance(out, (str, os.PathLike)):
+        # utf-8-sig para que Excel respete los acentos
+        with open(out, "w", encoding="utf-8-sig", newline="") as f:
+            return write_csv(chunks, f)
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    try:
+        return write_csv(chunks, text)
+    finally:
+        text.flush()
+        text.detach()
+
+
+def export_to_file(fmt, start=None, end=None):
+    """
+    Exporta a un archivo temporal (en RAM si es pequeño, en disco si no) y lo
+    devuelve rebobinado; para el botón de descarga del dashboard.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    export_requests(fmt, spool, start, end)
+    spool.seek(0)
+    return spool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar solicitudes a CSV o Parquet")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--out", required=True, help="archivo de salida")
+    parser.add_argument("--start", type=date.fromisoformat, help="fecha local inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="fecha local final, inclusiva")
+    parser.add_argument("--yesterday", action="store_true", help="solo el día anterior (para cron)")
+    args = parser.parse_args()
+
+    start, end = args.start, args.end
+    if args.yesterday:
+        start = end = datetime.now(pytz.timezone("America/El_Salvador")).date() - timedelta(days=1)
+    elif (start is None) != (end is None):
+        parser.error("--start y --end van juntos")
+
+    rows = export_requests(args.format, args.out, start, end)
+    print(f"✅ {rows} solicitudes exportadas a {args.out}")
+
+
+if __name__ == "__main__":
+    main()
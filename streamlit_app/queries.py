@@ -0,0 +1,155 @@
+import re
+from datetime import datetime, time, timedelta
+from time import perf_counter
+import pandas as pd
+from bot.db import get_connection
+
+# El servidor guarda en UTC; El Salvador es UTC-6 (sin horario de verano)
+SERVER_UTC_OFFSET_HOURS = 6
+
+# Los KPIs y gráficas se leen de los rollups horarios (ver streamlit_app/rollups.py).
+# Hora local en SQL; los filtros van sobre `hour_start` sin transformar para
+# usar la llave primaria. El desfase es de horas enteras, así que cada hora
+# del servidor corresponde exactamente a una hora local.
+LOCAL_HOUR = f"(hour_start - INTERVAL {SERVER_UTC_OFFSET_HOURS} HOUR)"
+
+
+def _fetch(sql, params=()):
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return rows
+
+def utc_range(start, end):
+    """Rango [inicio, fin) en hora del servidor para fechas locales inclusivas"""
+    offset = timedelta(hours=SERVER_UTC_OFFSET_HOURS)
+    return (
+        datetime.combine(start, time.min) + offset,
+        datetime.combine(end + timedelta(days=1), time.min) + offset,
+    )
+
+
+def get_date_bounds():
+    """(fecha mínima, fecha máxima) locales, o None si no hay solicitudes"""
+    rows = _fetch(f"SELECT MIN({LOCAL_HOUR}), MAX({LOCAL_HOUR}) FROM request_rollup_hourly")
+    low, high = rows[0]
+    if low is None:
+        return None
+    return pd.Timestamp(low).date(), pd.Timestamp(high).date()
+
+def get_day_count(day):
+    """Solicitudes registradas en un día local"""
+    total = _fetch(
+        "SELECT SUM(count) FROM request_rollup_hourly WHERE hour_start >= %s AND hour_start < %s",
+        utc_range(day, day)
+    )[0][0]
+    return int(total or 0)
+
+def get_hourly_counts(start, end):
+    """
+    Rollups del rango en hora local: (timestamp, tipo_solicitud, count).
+    A lo sumo 24 filas por día y tipo; compute_summary() saca de aquí todo lo demás.
+    """
+    rows = _fetch(
+        f"SELECT {LOCAL_HOUR} AS timestamp, tipo_solicitud, count FROM request_rollup_hourly "
+        "WHERE hour_start >= %s AND hour_start < %s",
+        utc_range(start, end)
+    )
+    frame = pd.DataFrame(rows, columns=["timestamp", "tipo_solicitud", "count"])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+    return frame.astype({"count": "int64"})
+
+
+# -------------------------------------------------------
+# TABLA DE REGISTROS (paginación por llave: timestamp, id)
+# -------------------------------------------------------
+DETAIL_PREVIEW_CHARS = 80
+
+PAGE_COLUMNS = ["id", "timestamp", "nombre", "correo", "tipo_solicitud", "detalle"]
+
+def _to_local(frame):
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"]) - timedelta(hours=SERVER_UTC_OFFSET_HOURS)
+    return frame
+
+def get_requests_page(start, end, page_size, after=None):
+    """
+    Una página de solicitudes del rango, de la más reciente a la más antigua.
+    `after` es la llave (timestamp, id) de la última fila de la página anterior;
+    la consulta sigue el índice de timestamp desde ahí, así que el costo no
+    depende de cuántas páginas haya antes. El detalle viene recortado.
+    Devuelve (DataFrame, llave de la siguiente página o None).
+    """
+    sql = (
+        "SELECT id, timestamp, nombre, correo, tipo_solicitud, "
+        f"LEFT(detalle, {DETAIL_PREVIEW_CHARS}) AS detalle "
+        "FROM requests WHERE timestamp >= %s AND timestamp < %s"
+    )
+    params = list(utc_range(start, end))
+    if after is not None:
+        sql += " AND (timestamp < %s OR (timestamp = %s AND id < %s))"
+        params += [after[0], after[0], after[1]]
+    # Una fila extra para saber si hay página siguiente
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT %s"
+    params.append(page_size + 1)
+
+    rows = _fetch(sql, params)
+    page = _to_local(pd.DataFrame(rows[:page_size], columns=PAGE_COLUMNS))
+    next_key = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        next_key = (last[1], last[0])
+    return page, next_key
+
+def get_request_detail(request_id):
+    """Detalle completo de una solicitud (solo al seleccionarla en la tabla)"""
+    rows = _fetch("SELECT detalle FROM requests WHERE id = %s", (request_id,))
+    return rows[0][0] if rows else None
+
+
+# -------------------------------------------------------
+# BÚSQUEDA (índice FULLTEXT ft_requests_busqueda)
+# -------------------------------------------------------
+# innodb_ft_min_token_size: palabras más cortas no están en el índice
+FULLTEXT_MIN_TOKEN = 3
+_TOKEN_RE = re.compile(r"\w+")
+_MATCH = "MATCH(nombre, correo, detalle) AGAINST (%s IN BOOLEAN MODE)"
+
+def fulltext_query(text):
+    """
+    Convierte lo que escribe el operador en una consulta BOOLEAN MODE: cada
+    palabra es obligatoria y se busca como prefijo ("jper" encuentra
+    "jperez@..."). Los operadores del usuario se descartan. "" si no queda nada.
+    """
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if len(t) >= FULLTEXT_MIN_TOKEN]
+    return " ".join(f"+{token}*" for token in tokens)
+
+def search_requests(text, start=None, end=None, limit=50):
+    """
+    Solicitudes que coinciden con `text` en nombre, correo o detalle,
+    ordenadas por relevancia. Devuelve (DataFrame con columna score, ms).
+    """
+    query = fulltext_query(text)
+    if not query:
+        return _to_local(pd.DataFrame([], columns=PAGE_COLUMNS + ["score"])), 0.0
+
+    sql = (
+        "SELECT id, timestamp, nombre, correo, tipo_solicitud, "
+        f"LEFT(detalle, {DETAIL_PREVIEW_CHARS}) AS detalle, "
+        f"{_MATCH} AS score FROM requests WHERE {_MATCH}"
+    )
+    params = [query, query]
+    if start is not None:
+        sql += " AND timestamp >= %s AND timestamp < %s"
+        params += list(utc_range(start, end))
+    sql += " ORDER BY score DESC, timestamp DESC, id DESC LIMIT %s"
+    params.append(limit)
+
+    started = perf_counter()
+    rows = _fetch(sql, params)
+    elapsed_ms = (perf_counter() - started) * 1000
+    return _to_local(pd.DataFrame(rows, columns=PAGE_COLUMNS + ["score"])), elapsed_ms
@@ -0,0 +1,183 @@
+"""
+Mantenimiento de los rollups horarios de `requests`.
+
+    python -m streamlit_app.rollups compact   # suma solo los ids nuevos
+    python -m streamlit_app.rollups compact --every 15   # proceso aparte, cada 15 s
+    python -m streamlit_app.rollups check     # compara rollups vs. datos crudos
+    python -m streamlit_app.rollups rebuild   # reconstruye desde cero
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from bot.db import get_connection
+
+ROLLUP_NAME = "request_rollup_hourly"
+# Ids por transacción de compactación
+COMPACT_BATCH = int(os.getenv("ROLLUP_COMPACT_BATCH", "50000"))
+# Las filas más recientes que esto esperan a la próxima compactación: un
+# AUTO_INCREMENT menor puede confirmarse después de uno mayor.
+COMPACT_LAG_SECONDS = int(os.getenv("ROLLUP_COMPACT_LAG_SECONDS", "5"))
+
+# Inicio de la hora (en hora del servidor) de cada solicitud
+HOUR_BUCKET = "DATE(timestamp) + INTERVAL HOUR(timestamp) HOUR"
+
+_AGGREGATE_SQL = f"""
+    SELECT {HOUR_BUCKET} AS hour_start, COALESCE(tipo_solicitud, '') AS tipo, COUNT(*)
+    FROM requests
+    WHERE id > %s AND id <= %s
+    GROUP BY hour_start, tipo
+"""
+
+
+def compact_rollups():
+    """
+    Suma a los rollups las solicitudes con id mayor al último procesado.
+    Devuelve cuántas solicitudes se agregaron.
+    """
+    conn = get_connection()
+    processed = 0
+    try:
+        cursor = conn.cursor()
+        while True:
+            conn.start_transaction()
+            cursor.execute(
+                "SELECT last_id FROM rollup_state WHERE name = %s FOR UPDATE", (ROLLUP_NAME,)
+            )
+            last_id = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT MAX(id), COUNT(*) FROM ("
+                "  SELECT id FROM requests WHERE id > %s "
+                "  AND timestamp < NOW() - INTERVAL %s SECOND ORDER BY id LIMIT %s"
+                ") AS nuevos",
+                (last_id, COMPACT_LAG_SECONDS, COMPACT_BATCH)
+            )
+            new_max, count = cursor.fetchone()
+            if not count:
+                conn.rollback()
+                break
+
+            cursor.execute(
+                "INSERT INTO request_rollup_hourly (hour_start, tipo_solicitud, count) "
+                + _AGGREGATE_SQL +
+                " ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+                (last_id, new_max)
+            )
+            cursor.execute(
+                "UPDATE rollup_state SET last_id = %s WHERE name = %s", (new_max, ROLLUP_NAME)
+            )
+            conn.commit()
+            processed += count
+        cursor.close()
+    finally:
+        conn.close()
+    return processed
+
+
+def get_watermark():
+    """Último id de requests ya incluido en los rollups"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT last_id FROM rollup_state WHERE name = %s", (ROLLUP_NAME,))
+        row = cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+
+def rebuild_rollups():
+    """Reconstruye los rollups completos desde requests en una sola transacción"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        conn.start_transaction()
+        # Bloquea la compactación mientras se reconstruye
+        cursor.execute(
+            "SELECT last_id FROM rollup_state WHERE name = %s FOR UPDATE", (ROLLUP_NAME,)
+        )
+        cursor.fetchone()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM requests")
+        max_id = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM request_rollup_hourly")
+        cursor.execute(
+            "INSERT INTO request_rollup_hourly (hour_start, tipo_solicitud, count) " + _AGGREGATE_SQL,
+            (0, max_id)
+        )
+        cursor.execute(
+            "UPDATE rollup_state SET last_id = %s WHERE name = %s", (max_id, ROLLUP_NAME)
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return max_id
+
+
+def check_rollups():
+    """
+    Recalcula los conteos desde requests (hasta el último id compactado) y los
+    compara con los rollups. Devuelve [(hour_start, tipo, rollup, crudo)] con
+    las diferencias; lista vacía si todo cuadra.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        # Misma foto de ambas tablas aunque haya una compactación en curso
+        conn.start_transaction(consistent_snapshot=True, readonly=True)
+        cursor.execute("SELECT last_id FROM rollup_state WHERE name = %s", (ROLLUP_NAME,))
+        last_id = cursor.fetchone()[0]
+        cursor.execute(_AGGREGATE_SQL, (0, last_id))
+        raw = {(hour, tipo): count for hour, tipo, count in cursor.fetchall()}
+        cursor.execute("SELECT hour_start, tipo_solicitud, count FROM request_rollup_hourly")
+        rolled = {(hour, tipo): count for hour, tipo, count in cursor.fetchall()}
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+    diffs = []
+    for key in sorted(raw.keys() | rolled.keys()):
+        if raw.get(key, 0) != rolled.get(key, 0):
+            diffs.append((key[0], key[1], rolled.get(key, 0), raw.get(key, 0)))
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollups horarios de solicitudes")
+    parser.add_argument("command", choices=["compact", "check", "rebuild"])
+    parser.add_argument("--fix", action="store_true", help="con check: reconstruir si hay diferencias")
+    parser.add_argument("--every", type=float, help="con compact: repetir cada N segundos (el dashboard solo lee)")
+    args = parser.parse_args()
+
+    if args.command == "compact" and args.every:
+        while True:
+            try:
+                added = compact_rollups()
+                if added:
+                    print(f"Solicitudes agregadas: {added}")
+            except Exception as e:
+                print(f"Error compactando rollups: {e}")
+            time.sleep(args.every)
+    elif args.command == "compact":
+        print(f"Solicitudes agregadas: {compact_rollups()}")
+    elif args.command == "rebuild":
+        print(f"Rollups reconstruidos hasta id {rebuild_rollups()}")
+    else:
+        diffs = check_rollups()
+        for hour, tipo, rolled, raw in diffs:
+            print(f"{hour}  {tipo or '(sin tipo)'}: rollup={rolled} crudo={raw}")
+        print("✅ Rollups consistentes" if not diffs else f"⚠️ {len(diffs)} diferencias")
+        if diffs and args.fix:
+            print(f"Rollups reconstruidos hasta id {rebuild_rollups()}")
+        sys.exit(1 if diffs and not args.fix else 0)
+
+
+if __name__ == "__main__":
+    main()
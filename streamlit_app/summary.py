@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+HOURS_PER_WEEK = 7 * 24
+# 1970-01-01 fue jueves: (días desde epoch + 3) % 7 da 0 = lunes, como pandas
+EPOCH_WEEKDAY_SHIFT = 3
+
+
+@dataclass(slots=True)
+class DashboardSummary:
+    """KPIs, gráficas e insights del dashboard para un rango de fechas"""
+    total: int
+    today: int
+    top_tramite: str | None
+    top_share_pct: int
+    peak_hour: int | None
+    trend: pd.DataFrame          # date, count (solo días con solicitudes)
+    distribution: pd.DataFrame   # tipo_solicitud, count (de mayor a menor)
+    heatmap: np.ndarray          # 7 x 24: día de la semana (0 = lunes) x hora
+    hour_counts: np.ndarray      # 24
+
+
+def compute_summary(frame, today=None):
+    """
+    Calcula todo en una sola pasada sobre `frame` (hora local en `timestamp`,
+    `tipo_solicitud` y, opcionalmente, `count` como peso). Sirve igual para
+    filas crudas de requests (peso 1) que para rollups horarios.
+
+    Cada fila se reduce a códigos enteros (hora desde epoch, tipo) y los
+    conteos salen de np.bincount, sin columnas derivadas ni groupby.
+    """
+    n = len(frame)
+    if "count" in frame:
+        weights = frame["count"].to_numpy(dtype=np.int64)
+    else:
+        weights = np.ones(n, dtype=np.int64)
+    total = int(weights.sum())
+    if not total:
+        return DashboardSummary(
+            total=0, today=0, top_tramite=None, top_share_pct=0, peak_hour=None,
+            trend=pd.DataFrame({"date": [], "count": []}),
+            distribution=pd.DataFrame({"tipo_solicitud": [], "count": []}),
+            heatmap=np.zeros((7, 24), dtype=np.int64),
+            hour_counts=np.zeros(24, dtype=np.int64),
+        )
+
+    hours = frame["timestamp"].to_numpy().astype("datetime64[h]").astype(np.int64)
+    days = hours // 24
+    hour_of_day = hours - days * 24
+    weekday = (days + EPOCH_WEEKDAY_SHIFT) % 7
+
+    # Día de la semana x hora en una sola cuenta
+    heatmap = np.bincount(
+        weekday * 24 + hour_of_day, weights=weights, minlength=HOURS_PER_WEEK
+    ).astype(np.int64).reshape(7, 24)
+    hour_counts = heatmap.sum(axis=0)
+
+    first_day = days.min()
+    per_day = np.bincount(days - first_day, weights=weights).astype(np.int64)
+    active = np.flatnonzero(per_day)
+    trend = pd.DataFrame({
+        "date": (active + first_day).astype("datetime64[D]").astype(object),
+        "count": per_day[active],
+    })
+
+    today_count = 0
+    if today is not None:
+        today_index = int(np.datetime64(today, "D").astype(np.int64)) - first_day
+        if 0 <= today_index < len(per_day):
+            today_count = int(per_day[today_index])
+
+    tipos = frame["tipo_solicitud"]
+    if isinstance(tipos.dtype, pd.CategoricalDtype):
+        codes, labels = tipos.cat.codes.to_numpy(), tipos.cat.categories
+    else:
+        codes, labels = pd.factorize(tipos, use_na_sentinel=True)
+    # Los nulos (-1) se cuentan en el total pero no en la distribución
+    valid = codes >= 0
+    per_tipo = np.bincount(codes[valid], weights=weights[valid], minlength=len(labels)).astype(np.int64)
+    labels = np.asarray(labels, dtype=object)
+    # De mayor a menor; empates por nombre
+    order = np.lexsort((labels.astype(str), -per_tipo))
+    order = order[per_tipo[order] > 0]
+    distribution = pd.DataFrame({"tipo_solicitud": labels[order], "count": per_tipo[order]})
+
+    top_tramite = distribution["tipo_solicitud"].iloc[0] if len(distribution) else None
+    top_share = int(distribution["count"].iloc[0] * 100 / total) if len(distribution) else 0
+
+    return DashboardSummary(
+        total=total,
+        today=today_count,
+        top_tramite=top_tramite,
+        top_share_pct=top_share,
+        peak_hour=int(hour_counts.argmax()),
+        trend=trend,
+        distribution=distribution,
+        heatmap=heatmap,
+        hour_counts=hour_counts,
+    )
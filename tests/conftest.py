@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+# bot.openai_client crea el cliente al importarse; las pruebas nunca llaman a la API
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,95 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from telegram.error import Forbidden
+
+from bot import broadcast
+
+
+class FakeBot:
+    """send_message que registra entregas y se corta tras `crash_after` envíos"""
+
+    def __init__(self, blocked=(), crash_after=None):
+        self.blocked = set(blocked)
+        self.crash_after = crash_after
+        self.delivered = Counter()
+        self.crashed = asyncio.Event()
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if self.crashed.is_set():
+            # Después de la "caída" ya nada sale
+            await asyncio.sleep(3600)
+        await asyncio.sleep(0)
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.delivered[chat_id] += 1
+        if self.crash_after is not None and sum(self.delivered.values()) >= self.crash_after:
+            self.crashed.set()
+
+
+@pytest.fixture
+def recipients(monkeypatch):
+    user_ids = [str(1000 + i) for i in range(30)]
+    monkeypatch.setattr(broadcast, "count_recipients", lambda tipo=None: len(user_ids))
+    monkeypatch.setattr(
+        broadcast, "fetch_recipients",
+        lambda after, limit, tipo=None: [u for u in user_ids if u > after][:limit]
+    )
+    return user_ids
+
+
+async def run_until_crash(bot, checkpoint, batch_size):
+    task = asyncio.create_task(broadcast.run_broadcast(
+        bot, "Aviso", checkpoint_path=checkpoint, batch_size=batch_size, rate=1000, workers=4
+    ))
+    crashed = asyncio.create_task(bot.crashed.wait())
+    await asyncio.wait([task, crashed], return_when=asyncio.FIRST_COMPLETED)
+    crashed.cancel()
+    if task.done():
+        return task.result()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    return None
+
+
+def resume(bot, checkpoint, batch_size):
+    bot.crash_after = None
+    bot.crashed = asyncio.Event()
+    return asyncio.run(broadcast.run_broadcast(
+        bot, "Aviso", checkpoint_path=checkpoint, batch_size=batch_size, rate=1000, workers=4
+    ))
+
+
+@pytest.mark.parametrize("batch_size", [50, 10])
+def test_crash_resumes_without_duplicates(tmp_path, recipients, batch_size):
+    # Con lotes de 50 la caída es dentro del primer lote, antes de que haya checkpoint
+    checkpoint = str(tmp_path / "checkpoint.json")
+    # Telegram recibe el chat_id como número
+    blocked = {int(u) for u in recipients[:3]}
+    bot = FakeBot(blocked=blocked, crash_after=12)
+
+    assert asyncio.run(run_until_crash(bot, checkpoint, batch_size)) is None
+    counts = resume(bot, checkpoint, batch_size)
+
+    assert max(bot.delivered.values()) == 1
+    assert set(bot.delivered) == {int(u) for u in recipients} - blocked
+    assert counts == {"sent": 27, "blocked": 3, "failed": 0}
+
+
+def test_journal_without_checkpoint_is_loaded(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    first = broadcast.Checkpoint(path, "clave")
+    first.mark("1000", "sent")
+    first.mark("1001", "blocked")
+    first.close()
+
+    resumed = broadcast.Checkpoint(path, "clave")
+    assert resumed.load()
+    assert resumed.after == ""
+    assert resumed.done_in_batch == {"1000": "sent", "1001": "blocked"}
+    assert resumed.batch_counts() == {"sent": 1, "blocked": 1, "failed": 0}
+
+    with pytest.raises(RuntimeError):
+        broadcast.Checkpoint(path, "otra clave").load()
@@ -0,0 +1,173 @@
+import asyncio
+import types
+
+import pytest
+
+from bot.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **kwargs):
+    params = dict(window_seconds=30, min_calls=4, error_rate=0.5, slow_call_seconds=5,
+                  slow_call_rate=0.8, open_seconds=10, half_open_probes=1, probe_timeout=20)
+    params.update(kwargs)
+    return CircuitBreaker(clock=clock, **params)
+
+
+def trip(breaker, clock):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow()
+        breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_opens_on_error_rate_once_min_calls_reached():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for ok in (False, False, True):
+        breaker.record(ok, 0.1)
+    # Menos de min_calls: todavía no decide
+    assert breaker.state == CLOSED
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_opens_on_slow_calls():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(True, 6)
+    assert breaker.state == OPEN
+
+
+def test_old_calls_leave_the_window():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    clock.now += 31
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker, clock)
+
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Una sola prueba a la vez
+    assert not breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_slow_probe_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker, clock)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record(True, 6)
+    assert breaker.state == OPEN
+
+
+def test_released_probe_frees_its_slot():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker, clock)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_abandoned_probe_expires():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker, clock)
+    clock.now += 10
+    assert breaker.allow()
+    # La prueba nunca informa su resultado
+    clock.now += 19
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.get_stats()["expired_probes"] == 1
+
+
+@pytest.fixture
+def openai_client(monkeypatch):
+    from bot import openai_client
+
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    monkeypatch.setattr(openai_client, "openai_breaker", breaker)
+    monkeypatch.setattr(openai_client.response_cache, "get", lambda message: None)
+    monkeypatch.setattr(openai_client.response_cache, "set", lambda message, answer: None)
+    return openai_client, breaker, clock
+
+
+def fake_async_client(create):
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker(openai_client, monkeypatch):
+    client, breaker, clock = openai_client
+    trip(breaker, clock)
+    clock.now += 10
+
+    started = asyncio.Event()
+
+    async def hanging_create(**kwargs):
+        started.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(client, "async_client", fake_async_client(hanging_create))
+
+    async def scenario():
+        task = asyncio.create_task(client.ask_openai_async("¿Cuál es el horario?"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    # La prueba cancelada liberó su lugar: la siguiente llamada puede probar
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_cache_error_is_not_an_openai_failure(openai_client, monkeypatch):
+    client, breaker, clock = openai_client
+
+    async def create(**kwargs):
+        message = types.SimpleNamespace(content="Abrimos de 8 a 4")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    def broken_set(message, answer):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(client, "async_client", fake_async_client(create))
+    monkeypatch.setattr(client.response_cache, "set", broken_set)
+
+    answer = asyncio.run(client.ask_openai_async("¿Cuál es el horario?"))
+    assert answer == "Abrimos de 8 a 4"
+    assert breaker.get_stats()["window_error_rate"] == 0.0
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+
+from bot.conversation_logger import ConversationLogger
+
+
+class FakeInsert:
+    """insert_batch en memoria; `down` simula la base de datos caída"""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+
+    async def __call__(self, rows):
+        if self.down:
+            raise ConnectionError("sin conexión")
+        self.rows.extend(rows)
+
+
+def make_logger(tmp_path, insert, **kwargs):
+    kwargs.setdefault("flush_interval", 0.01)
+    return ConversationLogger(spill_path=str(tmp_path / "spill.jsonl"), insert_batch=insert, **kwargs)
+
+
+def test_replayed_rows_keep_the_time_they_were_logged(tmp_path):
+    insert = FakeInsert()
+    logger = make_logger(tmp_path, insert)
+
+    async def scenario():
+        logger.start()
+        insert.down = True
+        logger.log(1, "hola", "¡Hola!")
+        logged_at = time.time()
+        while logger.stats["spilled"] < 1:
+            await asyncio.sleep(0.01)
+        insert.down = False
+        logger.log(2, "horario", "8 a 4")
+        await logger.stop()
+        return logged_at
+
+    logged_at = asyncio.run(scenario())
+    assert logger.stats["replayed"] == 1
+    replayed = next(row for row in insert.rows if row[0] == "1")
+    # Hora del log(), no la del derrame ni la de la reinserción
+    assert replayed[:3] == ("1", "hola", "¡Hola!")
+    assert replayed[3] <= logged_at
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+def test_spill_left_by_a_previous_run_is_replayed_on_start(tmp_path):
+    with open(tmp_path / "spill.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps(["7", "requisitos", "DUI", 1700000000.5]) + "\n")
+        f.write('["8", "a medio')
+    insert = FakeInsert()
+    logger = make_logger(tmp_path, insert)
+
+    async def scenario():
+        logger.start()
+        await logger.stop()
+
+    asyncio.run(scenario())
+    assert insert.rows == [("7", "requisitos", "DUI", 1700000000.5)]
+
+
+def test_overflow_is_capped_and_the_rest_is_dropped(tmp_path):
+    insert = FakeInsert()
+    logger = make_logger(tmp_path, insert, max_queue=1, max_overflow=2)
+
+    async def scenario():
+        for i in range(5):
+            logger.log(i, "hola", "¡Hola!")
+        stats = logger.get_stats()
+        logger.start()
+        await logger.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["queued"] == 1
+    assert stats["pending"] == 3
+    assert stats["dropped"] == 2
+    # La fila de la cola entra directo; las dos del desborde pasan por el archivo
+    assert logger.stats["spilled"] == 2
+    assert sorted(row[0] for row in insert.rows) == ["0", "1", "2"]
@@ -0,0 +1,85 @@
+import datetime
+
+import pytest
+
+from streamlit_app.data_loader import RequestsFrameStore
+
+
+class FakeRequests:
+    """Tabla requests visible: (id, timestamp, tipo, ya fuera de la ventana de atraso)"""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, request_id, settled=True, tipo="beca"):
+        ts = datetime.datetime(2024, 5, 1, 14, 0) + datetime.timedelta(minutes=request_id)
+        self.rows.append((request_id, ts, tipo, settled))
+        self.rows.sort()
+
+    def settle(self):
+        self.rows = [(i, ts, tipo, True) for i, ts, tipo, _ in self.rows]
+
+    def fetch(self, store):
+        return [row for row in self.rows if row[0] > store.settled_id]
+
+
+@pytest.fixture
+def requests_table(monkeypatch):
+    table = FakeRequests()
+    monkeypatch.setattr(RequestsFrameStore, "_fetch_new", lambda store: table.fetch(store))
+    return table
+
+
+def ids(store):
+    return sorted(store.df["id"].tolist())
+
+
+def test_late_commit_with_lower_id_is_picked_up(tmp_path, requests_table):
+    store = RequestsFrameStore(snapshot_dir=str(tmp_path))
+    for request_id in (1, 2):
+        requests_table.add(request_id)
+    requests_table.add(4, settled=False)
+    assert store.refresh() == 3
+    assert store.settled_id == 2
+
+    # El id 3 se confirma después del 4
+    requests_table.add(3, settled=False)
+    version = store.version
+    assert store.refresh() == 1
+    assert ids(store) == [1, 2, 3, 4]
+    assert store.max_id == 4
+    assert store.version == version + 1
+
+    requests_table.settle()
+    assert store.refresh() == 0
+    assert store.settled_id == 4
+    assert ids(store) == [1, 2, 3, 4]
+
+
+def test_window_survives_a_restart(tmp_path, requests_table):
+    store = RequestsFrameStore(snapshot_dir=str(tmp_path))
+    requests_table.add(1)
+    requests_table.add(3, settled=False)
+    store.refresh()
+
+    restarted = RequestsFrameStore(snapshot_dir=str(tmp_path))
+    assert restarted.settled_id == 1
+    requests_table.add(2, settled=False)
+    assert restarted.refresh() == 1
+    assert ids(restarted) == [1, 2, 3]
+    assert restarted.df["tipo_solicitud"].dtype == "category"
+
+
+def test_interrupted_compaction_is_deduplicated(tmp_path, requests_table):
+    store = RequestsFrameStore(snapshot_dir=str(tmp_path))
+    for request_id in (1, 2, 3):
+        requests_table.add(request_id)
+        store.refresh()
+    # Compactación cortada: la parte con todo (reemplaza a la última) quedó
+    # junto a las anteriores
+    store._write_part(store.df)
+    assert len(list(tmp_path.glob("part-*.arrow"))) == 3
+
+    restarted = RequestsFrameStore(snapshot_dir=str(tmp_path))
+    assert ids(restarted) == [1, 2, 3]
+    assert len(list(tmp_path.glob("part-*.arrow"))) == 1
@@ -0,0 +1,48 @@
+import pytest
+
+from bot.intents import classify_intent, classify_intents, score_intents
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("¿Cuál es el HORARIO?", "horario"),
+    ("¿A qué horas abren?", "horario"),
+    ("¿Qué requisitos piden?", "requisitos"),
+    ("Necesito información", "informacion"),
+    ("constancia de notas", "registrar_solicitud"),
+    ("Quiero hacer un trámite", "registrar_solicitud"),
+    ("hola buenas tardes", "otro"),
+    ("", "otro"),
+])
+def test_classify_intent(message, intent):
+    assert classify_intent(message) == intent
+
+
+def test_keywords_only_match_at_word_start():
+    # La cadena de `if` anterior respondía "horario" por el "hora" de "ahora"
+    assert classify_intent("ahora quiero una solicitud") == "registrar_solicitud"
+    assert score_intents("ahora mismo") == []
+
+
+def test_longest_keyword_counts_once():
+    assert score_intents("horario") == [("horario", 2)]
+    assert score_intents("horas") == [("horario", 1)]
+
+
+def test_weights_add_up_and_highest_score_wins():
+    assert score_intents("Necesito el documento para la constancia") == [
+        ("requisitos", 2), ("registrar_solicitud", 2),
+    ]
+    assert score_intents("trámite de constancia, ¿horario?") == [
+        ("registrar_solicitud", 4), ("horario", 2),
+    ]
+
+
+def test_ties_follow_table_order():
+    # "necesito" (requisitos, 1) empata con "ayuda" (informacion, 1)
+    assert classify_intent("necesito ayuda") == "requisitos"
+    assert classify_intent("ayuda, necesito") == "requisitos"
+
+
+def test_batch_matches_single_classification():
+    messages = ["horario", "ahora sí", "información del trámite", "hola"]
+    assert classify_intents(messages) == [classify_intent(m) for m in messages]
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+from telegram import Update
+
+from bot import metrics
+from bot.update_processor import PerUserUpdateProcessor
+
+
+def test_registering_a_prefix_again_replaces_it():
+    metrics.register_collector("csdc_test_collector", lambda: {"value": 1})
+    metrics.register_collector("csdc_test_collector", lambda: {"value": 2})
+    lines = [line for line in metrics.render().splitlines() if line.startswith("csdc_test_collector")]
+    assert lines == ["csdc_test_collector_value 2"]
+
+
+def make_update(update_id, user_id):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 1700000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Ana"},
+            "text": "hola",
+        },
+    }, None)
+
+
+def test_processor_stats_can_be_read_from_another_thread():
+    processor = PerUserUpdateProcessor(max_running=8)
+    errors = []
+    stop = threading.Event()
+
+    def scrape():
+        while not stop.is_set():
+            try:
+                processor.get_stats()
+                processor.queue_depths()
+            except Exception as e:
+                errors.append(e)
+
+    async def scenario():
+        async def handle():
+            await asyncio.sleep(0)
+
+        await asyncio.gather(*(
+            processor.process_update(make_update(i, i % 50), handle()) for i in range(2000)
+        ))
+
+    scraper = threading.Thread(target=scrape)
+    scraper.start()
+    try:
+        asyncio.run(scenario())
+    finally:
+        stop.set()
+        scraper.join()
+
+    assert errors == []
+    stats = processor.get_stats()
+    assert stats["processed"] == 2000
+    assert stats["pending"] == 0 and stats["active_users"] == 0 and stats["running"] == 0
+    assert stats["max_user_depth"] >= 2
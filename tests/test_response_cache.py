@@ -0,0 +1,42 @@
+import pytest
+
+from bot.response_cache import ResponseCache, cache_key
+
+
+@pytest.mark.parametrize("a, b", [
+    ("¿Cuál es el horario?", "cual es el horario"),
+    ("  CUÁL   es el HORARIO!!", "cuál es el horario"),
+    ("Where is the office?", "where is the office"),
+])
+def test_equivalent_messages_share_a_key(a, b):
+    assert cache_key(a) == cache_key(b)
+
+
+def test_language_is_part_of_the_key():
+    assert cache_key("Where is the office?").startswith("en:")
+    assert cache_key("¿Dónde queda la oficina?").startswith("es:")
+
+
+@pytest.mark.parametrize("message", ["👍", "???", "¿¿??", "ok", "", "  "])
+def test_near_empty_messages_are_not_cached(message):
+    assert cache_key(message) is None
+
+
+def test_near_empty_messages_never_share_an_answer():
+    cache = ResponseCache()
+    cache.set("👍", "¡De nada!")
+    assert cache.get("???") is None
+    assert cache.get_stats()["skipped"] == 1
+
+
+def test_persistent_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path=path).set("¿Cuál es el horario?", "8 a 4")
+    assert ResponseCache(path=path).get("cual es el horario") == "8 a 4"
+
+
+def test_expired_entry_is_a_miss(tmp_path):
+    cache = ResponseCache(ttl_seconds=0)
+    cache.set("¿Cuál es el horario?", "8 a 4")
+    assert cache.get("¿Cuál es el horario?") is None
+    assert cache.get_stats()["expired"] == 1
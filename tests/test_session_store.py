@@ -0,0 +1,123 @@
+import pytest
+
+from bot.session_store import MemorySessionStore, Session, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLiteSessionStore(path=str(tmp_path / "sessions.sqlite3"), ttl_seconds=60)
+        yield store
+        store.close()
+    else:
+        yield MemorySessionStore(ttl_seconds=60)
+
+
+def age(store, user_id, seconds):
+    """Hace que la sesión parezca guardada hace `seconds` segundos"""
+    session = store._sessions[user_id]
+    session.updated_at -= seconds
+    if isinstance(store, SQLiteSessionStore):
+        # Que la escritura diferida no pise el cambio
+        store.flush()
+        store._db.execute(
+            "UPDATE sessions SET updated_at = ? WHERE user_id = ?", (session.updated_at, user_id)
+        )
+        store._db.commit()
+
+
+def test_fresh_session_is_returned(store):
+    store.save(1, Session(step=2, nombre="Ana"))
+    assert store.get(1).nombre == "Ana"
+    assert 1 in store
+
+
+def test_expired_session_is_dropped_on_get(store):
+    store.save(1, Session(step=2))
+    age(store, 1, 61)
+    assert store.get(1) is None
+    assert 1 not in store
+    assert store.stats["expired"] == 1
+
+
+def test_save_renews_ttl(store):
+    session = Session(step=2)
+    store.save(1, session)
+    age(store, 1, 50)
+    store.save(1, session)
+    age(store, 1, 50)
+    assert store.get(1) is not None
+
+
+def test_purge_expired_removes_only_stale_sessions(store):
+    store.save(1, Session())
+    store.save(2, Session())
+    age(store, 1, 61)
+    assert store.purge_expired() == 1
+    assert len(store) == 1
+    assert store.get(2) is not None
+
+
+def test_sqlite_session_survives_restart_until_it_expires(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path=path, ttl_seconds=60)
+    store.save(1, Session(step=3, correo="ana@example.com"))
+    store.close()
+
+    restarted = SQLiteSessionStore(path=path, ttl_seconds=60)
+    assert restarted.get(1).correo == "ana@example.com"
+
+    age(restarted, 1, 61)
+    restarted.close()
+    again = SQLiteSessionStore(path=path, ttl_seconds=60)
+    assert again.get(1) is None
+    again.close()
+
+
+def test_sqlite_reads_do_not_touch_the_database(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path=path, ttl_seconds=60, flush_interval=60)
+    store.save(1, Session(step=2))
+    statements = []
+    store._db.set_trace_callback(statements.append)
+
+    assert store.get(1).step == 2
+    assert 1 in store
+    assert store.get(2) is None
+    assert 2 not in store
+    store.save(1, Session(step=3))
+    assert statements == []
+
+    store.close()
+    assert any(sql.startswith("INSERT OR REPLACE") for sql in statements)
+
+
+def test_sqlite_deletes_and_clear_survive_restart(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path=path, ttl_seconds=60)
+    for user_id in (1, 2, 3):
+        store.save(user_id, Session())
+    store.flush()
+    store.delete(2)
+    store.close()
+
+    restarted = SQLiteSessionStore(path=path, ttl_seconds=60)
+    assert 1 in restarted and 3 in restarted
+    assert 2 not in restarted
+    restarted.clear()
+    restarted.save(4, Session())
+    restarted.close()
+
+    again = SQLiteSessionStore(path=path, ttl_seconds=60)
+    assert len(again) == 1 and 4 in again
+    again.close()
+
+
+def test_lru_evicts_oldest_session():
+    store = MemorySessionStore(max_entries=2, ttl_seconds=60)
+    for user_id in (1, 2):
+        store.save(user_id, Session())
+    store.get(1)
+    store.save(3, Session())
+    assert 2 not in store
+    assert 1 in store and 3 in store
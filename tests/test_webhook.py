@@ -0,0 +1,115 @@
+import asyncio
+import http.client
+import json
+import queue
+import threading
+import types
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from bot import webhook
+
+VALID_UPDATE = {
+    "update_id": 7,
+    "message": {
+        "message_id": 1,
+        "date": 1700000000,
+        "chat": {"id": 5, "type": "private"},
+        "from": {"id": 5, "is_bot": False, "first_name": "Ana"},
+        "text": "hola",
+    },
+}
+
+
+class FakeWorker:
+    def __init__(self, alive=True):
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+@pytest.fixture
+def listener(monkeypatch):
+    monkeypatch.setattr(webhook, "WEBHOOK_SECRET", "secreto")
+    worker_queues = [queue.Queue(), queue.Queue()]
+    workers = [FakeWorker(), FakeWorker()]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), webhook._make_handler(worker_queues, workers))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(body, secret="secreto"):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        conn.request("POST", webhook.WEBHOOK_PATH, payload, {
+            "Content-Type": "application/json",
+            "X-Telegram-Bot-Api-Secret-Token": secret,
+        })
+        status = conn.getresponse().status
+        conn.close()
+        return status
+
+    yield post, worker_queues, workers
+    server.shutdown()
+    server.server_close()
+
+
+def test_updates_are_routed_by_user():
+    assert webhook.route_update(VALID_UPDATE, 2) == 5 % 2
+    assert webhook.route_update({"update_id": 8}, 2) == 0
+
+
+def test_valid_update_is_queued_for_its_worker(listener):
+    post, worker_queues, _ = listener
+    assert post(VALID_UPDATE) == 200
+    assert worker_queues[1].get_nowait() == VALID_UPDATE
+    assert worker_queues[0].empty()
+
+
+@pytest.mark.parametrize("body", [
+    b"no es json",
+    [1, 2],
+    {"update_id": 1, "message": "x"},
+    # Pasa el enrutado pero no es un update que Telegram pueda mandar
+    {"update_id": 1, "message": {"from": {"id": 5}}},
+])
+def test_malformed_update_is_rejected(listener, body):
+    post, worker_queues, _ = listener
+    assert post(body) == 400
+    assert all(q.empty() for q in worker_queues)
+
+
+def test_wrong_secret_is_forbidden(listener):
+    post, worker_queues, _ = listener
+    assert post(VALID_UPDATE, secret="otro") == 403
+    assert worker_queues[1].empty()
+
+
+def test_shard_without_worker_is_not_acked(listener):
+    post, worker_queues, workers = listener
+    workers[1].alive = False
+    assert post(VALID_UPDATE) == 503
+    assert worker_queues[1].empty()
+
+
+def test_bad_update_does_not_stop_the_worker():
+    updates = queue.Queue()
+    for data in ({"update_id": 1, "message": {"from": {"id": 5}}}, VALID_UPDATE, None):
+        updates.put(data)
+
+    async def scenario():
+        app = types.SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+        await webhook._forward_updates(app, updates)
+        return app.update_queue
+
+    received = asyncio.run(scenario())
+    assert received.qsize() == 1
+    assert received.get_nowait().update_id == 7
+
+
+def test_refuses_to_start_without_secret(monkeypatch):
+    monkeypatch.setattr(webhook, "WEBHOOK_URL", "https://example.com")
+    monkeypatch.setattr(webhook, "WEBHOOK_SECRET", "")
+    with pytest.raises(RuntimeError):
+        webhook.start_webhook(1)
@@ -0,0 +1,130 @@
+import json
+import os
+
+import pytest
+
+from bot.write_behind import CURRENT_JOURNAL, DEAD_LETTER, WriteBehindWriter
+
+
+class TransientError(Exception):
+    pass
+
+
+class FakeDB:
+    """insert_batch en memoria; `down` simula la base de datos caída y `rejects` filas inválidas"""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+        self.rejects = set()
+
+    def insert_batch(self, rows):
+        if self.down:
+            raise TransientError("sin conexión")
+        for row in rows:
+            if row[0] in self.rejects:
+                raise ValueError(f"fila inválida: {row[0]}")
+        self.rows.extend(rows)
+
+
+def make_writer(journal_dir, db, **kwargs):
+    # flush_interval largo: las pruebas envían con flush() explícito
+    kwargs.setdefault("flush_interval", 60)
+    return WriteBehindWriter(
+        str(journal_dir), db.insert_batch, transient_errors=(TransientError,), **kwargs
+    )
+
+
+def segments(journal_dir):
+    return sorted(p for p in os.listdir(journal_dir) if p.startswith("segment-"))
+
+
+def test_rows_are_inserted_and_journal_is_cleaned(tmp_path):
+    db = FakeDB()
+    writer = make_writer(tmp_path, db)
+    for i in range(5):
+        writer.append([f"u{i}"])
+    assert writer.flush()
+    writer.close()
+
+    assert db.rows == [[f"u{i}"] for i in range(5)]
+    assert segments(tmp_path) == []
+
+
+def test_rows_survive_an_outage_and_are_replayed_on_restart(tmp_path):
+    db = FakeDB()
+    db.down = True
+    writer = make_writer(tmp_path, db)
+    for i in range(3):
+        writer.append([f"u{i}"])
+    assert not writer.flush()
+    writer.close()
+    assert db.rows == []
+    assert segments(tmp_path)
+
+    db.down = False
+    writer = make_writer(tmp_path, db)
+    assert writer.get_stats()["replayed"] == 3
+    assert writer.flush()
+    writer.close()
+    assert db.rows == [["u0"], ["u1"], ["u2"]]
+    assert segments(tmp_path) == []
+
+
+def test_recovers_journal_left_by_a_crash(tmp_path):
+    # Diario abierto de un proceso que murió, con la última línea a medio escribir
+    with open(tmp_path / CURRENT_JOURNAL, "w", encoding="utf-8") as f:
+        f.write(json.dumps(["u0"]) + "\n" + json.dumps(["u1"]) + "\n" + '["u2"')
+
+    db = FakeDB()
+    writer = make_writer(tmp_path, db)
+    assert writer.flush()
+    writer.close()
+    assert db.rows == [["u0"], ["u1"]]
+
+
+def test_rejected_row_is_dead_lettered_without_blocking_the_rest(tmp_path):
+    db = FakeDB()
+    db.rejects = {"malo"}
+    writer = make_writer(tmp_path, db)
+    for user_id in ["u0", "malo", "u1"]:
+        writer.append([user_id])
+    assert writer.flush()
+    writer.append(["u2"])
+    assert writer.flush()
+    stats = writer.get_stats()
+    writer.close()
+
+    assert db.rows == [["u0"], ["u1"], ["u2"]]
+    assert stats["dead_lettered"] == 1
+    with open(tmp_path / DEAD_LETTER, encoding="utf-8") as f:
+        dead = [json.loads(line) for line in f]
+    assert [d["row"] for d in dead] == [["malo"]]
+    assert segments(tmp_path) == []
+
+
+def test_repeated_transient_failures_fall_back_to_row_by_row(tmp_path):
+    db = FakeDB()
+    db.down = True
+    writer = make_writer(tmp_path, db, max_attempts=2)
+    writer.append(["u0"])
+    assert not writer.flush()
+    # Segundo fallo seguido: se intenta fila por fila, y al seguir caída la fila se conserva
+    assert not writer.flush()
+    assert writer.get_stats()["buffered"] == 1
+
+    db.down = False
+    assert writer.flush()
+    writer.close()
+    assert db.rows == [["u0"]]
+    assert writer.get_stats()["dead_lettered"] == 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="sin flock en Windows")
+def test_journal_directory_is_locked_per_process(tmp_path):
+    db = FakeDB()
+    writer = make_writer(tmp_path, db)
+    with pytest.raises(RuntimeError):
+        make_writer(tmp_path, db)
+    writer.close()
+    make_writer(tmp_path, db).close()